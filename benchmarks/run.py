@@ -0,0 +1,193 @@
+import argparse
+import gc
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks import workflows
+from desync import desync
+from desync.cache import Cache
+from desync.hashtools import hash_function, hash_input
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+MIN_SECONDS = 0.1
+
+
+def bench_single(size: int) -> Callable[[], int]:
+    workflow = desync(workflows.single)
+
+    def run():
+        for item in range(size):
+            workflow(item)
+        return size
+    return run
+
+
+def bench_fanout_list(size: int) -> Callable[[], int]:
+    workflow = desync(workflows.fanout_list)
+
+    def run():
+        workflow(range(size))
+        return size
+    return run
+
+
+def bench_fanout_dict(size: int) -> Callable[[], int]:
+    workflow = desync(workflows.fanout_dict)
+
+    def run():
+        workflow(range(size))
+        return size
+    return run
+
+
+def bench_chain(size: int) -> Callable[[], int]:
+    workflow = desync(workflows.chain)
+
+    def run():
+        workflow(range(size))
+        return 10 * size
+    return run
+
+
+def bench_nested(size: int) -> Callable[[], int]:
+    workflow = desync(workflows.nested)
+
+    def run():
+        workflow(range(size))
+        return size
+    return run
+
+
+def bench_cache_hit(size: int) -> Callable[[], int]:
+    cache = Cache()
+    for item in range(size):
+        cache.set_outputs(hash_function(workflows.identity), hash_input([item], {}), item)
+    workflow = desync(workflows.fanout_list)
+    workflow.set_cache(cache)
+
+    def run():
+        workflow(range(size))
+        return size
+    return run
+
+
+def bench_hash_input(size: int) -> Callable[[], int]:
+    args = (list(range(size)), bytes(8 * size), {str(item): item for item in range(size)})
+
+    def run():
+        hash_input(args, {})
+        return size
+    return run
+
+
+def bench_save_load_cache(size: int) -> Callable[[], int]:
+    cache = Cache()
+    for item in range(size):
+        cache.set_outputs(item % 16, item, [item, str(item)])
+    workflow = desync(workflows.fanout_list)
+    workflow.set_new_cache(cache)
+
+    def run():
+        fileobj = io.BytesIO()
+        workflow.save_cache(fileobj)
+        fileobj.seek(0)
+        workflow.load_cache(fileobj)
+        return size
+    return run
+
+
+BENCHMARKS: Dict[str, Tuple[Callable[[int], Callable[[], int]], List[int], List[int]]] = {
+    'single': (bench_single, [10, 100], [10, 100, 1000]),
+    'fanout_list': (bench_fanout_list, [10, 1000, 10000], [10, 1000, 10000, 100000, 1000000]),
+    'fanout_dict': (bench_fanout_dict, [10, 1000, 10000], [10, 1000, 10000, 100000, 1000000]),
+    'chain': (bench_chain, [10, 1000], [10, 1000, 10000, 100000]),
+    'nested': (bench_nested, [10, 1000], [10, 1000, 10000, 100000]),
+    'cache_hit': (bench_cache_hit, [10, 1000, 10000], [10, 1000, 10000, 100000, 1000000]),
+    'hash_input': (bench_hash_input, [1000, 100000], [1000, 100000, 1000000]),
+    'save_load_cache': (bench_save_load_cache, [1000, 100000], [1000, 100000, 1000000]),
+}
+
+
+def measure(setup: Callable[[int], Callable[[], int]], size: int, repeat: int) -> Dict[str, float]:
+    run = setup(size)
+    number = 1
+    while time_runs(run, number)[0] < MIN_SECONDS:
+        number *= 2
+    best = float('inf')
+    ops = 0
+    for _ in range(repeat):
+        gc.collect()
+        elapsed, ops = time_runs(run, number)
+        best = min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'ops_per_sec': ops / best, 'peak_bytes': peak}
+
+
+def time_runs(run: Callable[[], int], number: int) -> Tuple[float, int]:
+    ops = 0
+    start = time.perf_counter()
+    for _ in range(number):
+        ops += run()
+    return time.perf_counter() - start, ops
+
+
+def load_baseline(filename: str) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(filename):
+        return {}
+    with open(filename) as fileobj:
+        return json.load(fileobj)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark desync and compare against a baseline.')
+    parser.add_argument('names', nargs='*', help='benchmarks to run (default: all)')
+    parser.add_argument('--full', action='store_true', help='include the largest sizes, up to 1M elements')
+    parser.add_argument('--sizes', type=int, nargs='+', help='sizes to run instead of the defaults')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='slowdown that counts as a regression')
+    args = parser.parse_args(argv)
+
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark {name}, expected one of {", ".join(BENCHMARKS)}')
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = 0
+    print(f'{"benchmark":<24} {"ops/sec":>14} {"baseline":>14} {"change":>8} {"peak MiB":>10}')
+    for name in args.names or BENCHMARKS:
+        setup, sizes, full_sizes = BENCHMARKS[name]
+        for size in args.sizes or (full_sizes if args.full else sizes):
+            key = f'{name}[{size}]'
+            results[key] = measure(setup, size, args.repeat)
+            ops = results[key]['ops_per_sec']
+            previous = baseline.get(key, {}).get('ops_per_sec')
+            change = '' if previous is None else f'{ops / previous - 1:+.0%}'
+            if previous is not None and ops < previous * (1 - args.threshold):
+                regressions += 1
+                change += ' !'
+            print(f'{key:<24} {ops:>14,.0f} {"" if previous is None else f"{previous:,.0f}":>14} {change:>8} '
+                  f'{results[key]["peak_bytes"] / 2 ** 20:>10.1f}', flush=True)
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, 'w') as fileobj:
+            json.dump(baseline, fileobj, indent=2, sort_keys=True)
+    return 1 if regressions > 0 and not args.save else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+from desync import desync
+
+
+def identity(item):
+    return item
+
+
+def increment(item):
+    return item + 1
+
+
+def single(item):
+    return identity(item)
+
+
+def fanout_list(items):
+    return [identity(item) for item in items]
+
+
+def fanout_dict(items):
+    return {item: identity(item) for item in items}
+
+
+def chain(items):
+    return [increment(increment(increment(increment(increment(increment(increment(increment(increment(increment(item))))))))))
+            for item in items]
+
+
+@desync
+def nested_inner(item):
+    return increment(item)
+
+
+def nested(items):
+    return [nested_inner(item) for item in items]
@@ -1,2 +1,3 @@
 from desync.desync import desync
 from desync.resource_manager import ResourceManager
+from desync.steps import batchable, immutable, requires, step
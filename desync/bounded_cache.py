@@ -0,0 +1,80 @@
+import heapq
+
+from desync.cache import Cache
+from typing import Any, Dict, Optional, Tuple
+
+
+class BoundedCache(Cache):
+    def __init__(
+        self,
+        max_bytes: int,
+        outputs: Optional[Dict[int, Dict[int, Any]]] = None,
+        storage: str = 'copy',
+    ):
+        super().__init__(storage=storage)
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._inflation = 0.0
+        self._entries: Dict[Tuple[int, int], Tuple[float, int, float]] = {}
+        self._heap = []
+        for func_hash, func_outputs in ({} if outputs is None else outputs).items():
+            for input_hash, outputs_ in func_outputs.items():
+                self.set_outputs(func_hash, input_hash, outputs_)
+
+    def set_outputs(
+        self,
+        func_hash: int,
+        input_hash: int,
+        outputs: Any,
+        cost: Optional[float] = None,
+        immutable: bool = False,
+    ):
+        key = (func_hash, input_hash)
+        if key in self._entries:
+            self._remove(key)
+        nbytes = self.nbytes
+        super().set_outputs(func_hash, input_hash, outputs, immutable=immutable)
+        size = max(self.nbytes - nbytes, 1)
+        self._entries[key] = (0.0, size, 0.0)
+        self.nbytes = nbytes + size
+        if size > self.max_bytes:
+            self._remove(key)
+            return
+        self._push(key, size, 0.0 if cost is None else cost)
+        while self.nbytes > self.max_bytes:
+            self._evict()
+
+    def get_outputs(self, func_hash, input_hash):
+        key = (func_hash, input_hash)
+        if key in self._entries:
+            _, size, cost = self._entries[key]
+            self._push(key, size, cost)
+        return super().get_outputs(func_hash, input_hash)
+
+    def get_cost(self, func_hash, input_hash) -> Optional[float]:
+        entry = self._entries.get((func_hash, input_hash))
+        return None if entry is None else entry[2]
+
+    def _push(self, key, size, cost):
+        priority = self._inflation + cost / size
+        self._entries[key] = (priority, size, cost)
+        heapq.heappush(self._heap, (priority, key))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(priority, key) for key, (priority, _, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _evict(self):
+        while True:
+            priority, key = heapq.heappop(self._heap)
+            if key in self._entries and self._entries[key][0] == priority:
+                break
+        self._inflation = priority
+        self._remove(key)
+
+    def _remove(self, key):
+        func_hash, input_hash = key
+        _, size, _ = self._entries.pop(key)
+        self.nbytes -= size
+        del self._outputs[func_hash][input_hash]
+        if len(self._outputs[func_hash]) == 0:
+            del self._outputs[func_hash]
@@ -1,16 +1,72 @@
+import copy
+import pickle
+
+from desync.sizetools import get_size
 from typing import Any, Dict, Optional
 
 
+class PickledOutputs:
+    __slots__ = ('data', 'buffers')
+
+    def __init__(self, outputs: Any):
+        buffers = []
+        self.data = pickle.dumps(outputs, protocol=5, buffer_callback=buffers.append)
+        self.buffers = [bytes(buffer.raw()) for buffer in buffers]
+
+    def load(self):
+        return pickle.loads(self.data, buffers=[bytearray(buffer) for buffer in self.buffers])
+
+
 class Cache:
-    def __init__(self, outputs: Optional[Dict[int, Dict[int, Any]]] = None):
+    STORAGES = ('copy', 'pickle', 'reference')
+
+    _storage = 'copy'
+    _costs = None
+    nbytes = None
+
+    def __init__(self, outputs: Optional[Dict[int, Dict[int, Any]]] = None, storage: str = 'copy'):
+        if storage not in self.STORAGES:
+            raise ValueError(f'unknown storage {storage}, expected one of {", ".join(self.STORAGES)}')
         self._outputs = {} if outputs is None else outputs
+        self._storage = storage
 
-    def set_outputs(self, func_hash: int, input_hash: int, outputs: Any):
-        self._outputs.setdefault(func_hash, {})
-        self._outputs[func_hash][input_hash] = outputs
+    def set_outputs(
+        self,
+        func_hash: int,
+        input_hash: int,
+        outputs: Any,
+        cost: Optional[float] = None,
+        immutable: bool = False,
+    ):
+        if not immutable and self._storage == 'copy':
+            outputs = copy.deepcopy(outputs)
+        elif not immutable and self._storage == 'pickle':
+            outputs = PickledOutputs(outputs)
+        func_outputs = self._outputs.setdefault(func_hash, {})
+        if self.nbytes is not None:
+            if input_hash in func_outputs:
+                self.nbytes -= get_size(func_outputs[input_hash])
+            self.nbytes += get_size(outputs)
+        func_outputs[input_hash] = outputs
+        if cost is not None:
+            if self._costs is None:
+                self._costs = {}
+            self._costs[(func_hash, input_hash)] = cost
 
     def get_outputs(self, func_hash, input_hash):
-        return self._outputs.get(func_hash, {}).get(input_hash, None)
+        outputs = self._outputs.get(func_hash, {}).get(input_hash, None)
+        return outputs.load() if isinstance(outputs, PickledOutputs) else outputs
 
     def has_outputs(self, func_hash, input_hash):
         return input_hash in self._outputs.get(func_hash, {})
+
+    def get_cost(self, func_hash, input_hash) -> Optional[float]:
+        return None if self._costs is None else self._costs.get((func_hash, input_hash))
+
+    def get_nbytes(self) -> int:
+        if self.nbytes is None:
+            self.nbytes = self._count_nbytes()
+        return self.nbytes
+
+    def _count_nbytes(self) -> int:
+        return sum(get_size(outputs) for func_outputs in self._outputs.values() for outputs in func_outputs.values())
@@ -0,0 +1,181 @@
+import atexit
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from typing import Any, Dict, Optional, Tuple
+
+
+HEADER = struct.Struct('!IQI')
+
+
+class Checkpoint:
+    def __init__(self, filename: str, sync_every: int = 64, sync_interval: float = 1.0):
+        self._filename = filename
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._index: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        self._costs: Dict[Tuple[int, int], float] = {}
+        self._pending: Dict[Tuple[int, int], Tuple[bytes, int, Optional[float]]] = {}
+        self._queue = queue.Queue()
+        self._writer = None
+        self._error = None
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._fileobj = open(filename, 'a+b')
+        self._load()
+
+    def __getstate__(self):
+        return {'filename': self._filename, 'sync_every': self.sync_every, 'sync_interval': self.sync_interval}
+
+    def __setstate__(self, state):
+        self.__init__(state['filename'], state['sync_every'], state['sync_interval'])
+
+    def set_outputs(
+        self,
+        func_hash: int,
+        input_hash: int,
+        outputs: Any,
+        cost: Optional[float] = None,
+        immutable: bool = False,
+    ):
+        key = (func_hash, input_hash)
+        if self.has_outputs(func_hash, input_hash):
+            return
+        try:
+            data = pickle.dumps(outputs, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        key_data = pickle.dumps(key + (cost,), protocol=pickle.HIGHEST_PROTOCOL)
+        checksum = zlib.crc32(data, zlib.crc32(key_data))
+        record = HEADER.pack(len(key_data), len(data), checksum) + key_data + data
+        with self._lock:
+            if key in self._index or key in self._pending:
+                return
+            self._pending[key] = (record, HEADER.size + len(key_data), cost)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write, daemon=True)
+                self._writer.start()
+                atexit.register(self.sync)
+        self._queue.put(key)
+
+    def get_outputs(self, func_hash, input_hash):
+        key = (func_hash, input_hash)
+        with self._lock:
+            if key in self._pending:
+                record, offset, _ = self._pending[key]
+                data = record[offset:]
+            elif key in self._index:
+                offset, size = self._index[key]
+                self._fileobj.seek(offset)
+                data = self._fileobj.read(size)
+            else:
+                return None
+        return pickle.loads(data)
+
+    def has_outputs(self, func_hash, input_hash):
+        key = (func_hash, input_hash)
+        return key in self._index or key in self._pending
+
+    def get_cost(self, func_hash, input_hash) -> Optional[float]:
+        key = (func_hash, input_hash)
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key][2]
+            return self._costs.get(key)
+
+    def get_nbytes(self) -> int:
+        with self._lock:
+            return self._fileobj.seek(0, os.SEEK_END) + sum(len(record) for record, _, _ in self._pending.values())
+
+    def sync(self):
+        self._queue.join()
+        with self._lock:
+            if not self._fileobj.closed:
+                self._sync()
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        self._queue.join()
+        with self._lock:
+            if not self._fileobj.closed:
+                self._sync()
+                self._fileobj.close()
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _write(self):
+        while True:
+            keys = [self._queue.get()]
+            while True:
+                try:
+                    keys.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(keys)
+            except Exception as error:
+                with self._lock:
+                    self._error = error
+            finally:
+                for _ in keys:
+                    self._queue.task_done()
+
+    def _write_batch(self, keys):
+        with self._lock:
+            try:
+                for key in keys:
+                    record, offset, cost = self._pending[key]
+                    if self._fileobj.closed:
+                        raise ValueError(f'checkpoint {self._filename} is closed')
+                    start = self._fileobj.seek(0, os.SEEK_END)
+                    self._fileobj.write(record)
+                    self._index[key] = (start + offset, len(record) - offset)
+                    if cost is not None:
+                        self._costs[key] = cost
+                    self._unsynced += 1
+                self._fileobj.flush()
+            finally:
+                for key in keys:
+                    self._pending.pop(key, None)
+            if self._unsynced < self.sync_every and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            fileno = self._fileobj.fileno()
+            self._unsynced = 0
+            self._synced_at = time.monotonic()
+        os.fsync(fileno)
+
+    def _sync(self):
+        self._fileobj.flush()
+        os.fsync(self._fileobj.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def _load(self):
+        offset = 0
+        self._fileobj.seek(0)
+        while True:
+            header = self._fileobj.read(HEADER.size)
+            if len(header) < HEADER.size:
+                break
+            key_size, size, checksum = HEADER.unpack(header)
+            key_data = self._fileobj.read(key_size)
+            data = self._fileobj.read(size)
+            if len(key_data) < key_size or len(data) < size or zlib.crc32(data, zlib.crc32(key_data)) != checksum:
+                break
+            func_hash, input_hash, *cost = pickle.loads(key_data)
+            self._index[(func_hash, input_hash)] = (offset + HEADER.size + key_size, size)
+            if len(cost) > 0 and cost[0] is not None:
+                self._costs[(func_hash, input_hash)] = cost[0]
+            offset += HEADER.size + key_size + size
+        if offset < self._fileobj.seek(0, os.SEEK_END):
+            self._fileobj.truncate(offset)
+            self._sync()
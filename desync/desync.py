@@ -1,24 +1,52 @@
-import ast
 import asyncio
+import functools
+import inspect
 import pickle
+import time
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Executor
 from desync.cache import Cache
+from desync.checkpoint import Checkpoint
+from desync.disk_cache import DiskCache
 from desync.function import Function
 from desync.futuretools import ensure_future
+from desync.graph import DataflowGraph
+from desync.hashtools import InputHasher, hash_input
+from desync.metrics import Registry
+from desync.profiler import Profiler
 from desync.resolver import resolve
+from desync.resource_manager import ResourceManager
+from desync.scheduler import Scheduler
+from desync.tracer import Tracer
 from desync.version import Version
 from desync.walker import Walker
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Desync:
-    def __init__(self, func, executor: Optional[ThreadPoolExecutor] = None):
+    def __init__(
+        self,
+        func,
+        executor: Optional[Executor] = None,
+        executors: Optional[Dict[str, Executor]] = None,
+        resource_manager: Optional[ResourceManager] = None,
+        window: Optional[int] = None,
+        tracer: Optional[Tracer] = None,
+        metrics: Optional[Registry] = None,
+        profiler: Optional[Profiler] = None,
+        checkpoint: Optional[str] = None,
+    ):
         self._func = Function(func)
-        self._executor = executor
-        self._version = Version(self._func.get_hash(), self._func.get_step_hashes())
-        self._old_cache = Cache()
-        self._new_cache = Cache()
+        self._tree = None
+        self._graph = None
+        self._scheduler = Scheduler(executor, executors, resource_manager, window, tracer, metrics, profiler)
+        self._version = None
+        self._hash = None
+        self._checkpoint = None if checkpoint is None else Checkpoint(checkpoint)
+        self._old_cache = Cache() if checkpoint is None else self._checkpoint
+        self._new_cache = Cache() if checkpoint is None else self._checkpoint
+        if self._scheduler.metrics is not None:
+            self._scheduler.metrics.watch_cache(self.get_cache, workflow=self.name)
 
     def __call__(self, *args, **kwargs):
         try:
@@ -29,23 +57,75 @@ class Desync:
         if loop is None:
             return asyncio.run(self.run_outer_workflow(args, kwargs))
 
-        scopes = [
-            self._func.get_module().__dict__,
-            {key: ensure_future(args[i]) if i < len(args) else ensure_future(kwargs[key])
-             for i, key in enumerate(self._func.get_signature().parameters)},
-        ]
-        walker = Walker(scopes, self._old_cache, self._new_cache)
-        tree = ast.parse(self._func.get_source())
-        return walker.eval_node(tree.body[0])
+        walker = Walker(self.get_scopes(args, kwargs), self._old_cache, self._new_cache, self._scheduler)
+        return walker.eval_node(self.get_tree().body[0])
+
+    def stream(self, *args, ordered: bool = False, **kwargs):
+        loop = asyncio.new_event_loop()
+        items = self.astream(*args, ordered=ordered, **kwargs)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(get_next(items))
+                except StopAsyncIteration:
+                    break
+        finally:
+            try:
+                loop.run_until_complete(items.aclose())
+                loop.run_until_complete(cancel_tasks())
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.run_until_complete(loop.shutdown_default_executor())
+            finally:
+                loop.close()
+
+    async def astream(self, *args, ordered: bool = False, **kwargs):
+        self.get_graph().prioritise(self._scheduler.durations)
+        walker = Walker(self.get_scopes(args, kwargs), self._old_cache, self._new_cache, self._scheduler)
+        res = walker.eval_node(self.get_tree().body[0])
+        while inspect.isawaitable(res):
+            res = await res
+        if isinstance(res, dict):
+            items = [asyncio.ensure_future(resolve_item(key, value)) for key, value in res.items()]
+        elif isinstance(res, (list, set, tuple)):
+            items = [asyncio.ensure_future(resolve(item)) for item in res]
+        else:
+            items = [asyncio.ensure_future(resolve(res))]
+        if ordered:
+            for item in items:
+                yield await item
+        else:
+            for item in asyncio.as_completed(items):
+                yield await item
+        await walker.join()
 
     @property
     def name(self):
         return self._func.name
 
+    def get_hash(self) -> int:
+        if self._hash is None:
+            hasher = InputHasher()
+            hasher.hash((self.get_version().major_hash, self.get_version().minor_hash, self._func.get_fingerprint()))
+            self._hash = hasher.intdigest()
+        return self._hash
+
+    def get_tree(self):
+        if self._tree is None:
+            self._tree = self._func.get_ast()
+            self._graph = DataflowGraph(self._tree)
+            self._graph.prioritise()
+        return self._tree
+
+    def get_graph(self):
+        self.get_tree()
+        return self._graph
+
     def set_version(self, version):
-        self._version.set_old_version(version)
+        self.get_version().set_old_version(version)
 
     def get_version(self):
+        if self._version is None:
+            self._version = Version(self._func.get_hash(), self._func.get_step_hashes())
         return self._version
 
     def load_version(self, fileobj):
@@ -60,28 +140,93 @@ class Desync:
     def get_cache(self):
         return self._new_cache
 
+    def set_new_cache(self, cache):
+        self._new_cache = cache
+
     def load_cache(self, fileobj):
         self.set_cache(pickle.load(fileobj))
 
     def save_cache(self, fileobj):
         pickle.dump(self.get_cache(), fileobj)
 
-    async def run_outer_workflow(self, args, kwargs):
-        if self._executor:
-            loop = asyncio.get_running_loop()
-            loop.set_default_executor(self._executor)
-
-        scopes = [
+    def get_scopes(self, args, kwargs):
+        return [
             self._func.get_module().__dict__,
             {key: ensure_future(args[i]) if i < len(args) else ensure_future(kwargs[key])
              for i, key in enumerate(self._func.get_signature().parameters)},
         ]
-        walker = Walker(scopes, self._old_cache, self._new_cache)
-        tree = self._func.get_ast()
-        res = walker.eval_node(tree.body[0])
+
+    async def run_outer_workflow(self, args, kwargs):
+        self.get_graph().prioritise(self._scheduler.durations)
+        try:
+            return await self.run_nested_workflow(args, kwargs, self._old_cache, self._new_cache, self._scheduler)
+        finally:
+            if self._checkpoint is not None:
+                self._checkpoint.sync()
+            if isinstance(self._new_cache, DiskCache):
+                self._new_cache.flush()
+
+    async def run_nested_workflow(self, args, kwargs, old_cache, new_cache, scheduler):
+        func_hash = self.get_hash()
+        input_hash = hash_input(args, kwargs)
+        if old_cache and old_cache.has_outputs(func_hash, input_hash):
+            result = old_cache.get_outputs(func_hash, input_hash)
+            cost = old_cache.get_cost(func_hash, input_hash)
+        else:
+            start = time.perf_counter()
+            result = await self.walk(args, kwargs, old_cache, new_cache, scheduler)
+            cost = time.perf_counter() - start
+        if new_cache:
+            try:
+                new_cache.set_outputs(func_hash, input_hash, result, cost=cost, immutable=True)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                pass
+        return result
+
+    async def walk(self, args, kwargs, old_cache, new_cache, scheduler):
+        walker = Walker(self.get_scopes(args, kwargs), old_cache, new_cache, scheduler)
+        res = walker.eval_node(self.get_tree().body[0])
         await walker.join()
         return await resolve(res)
 
 
-def desync(func):
-    return Desync(func)
+async def cancel_tasks():
+    tasks = asyncio.all_tasks() - {asyncio.current_task()}
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def get_next(items):
+    return await items.__anext__()
+
+
+async def resolve_item(key, value):
+    return key, await resolve(value)
+
+
+def desync(
+    func=None,
+    *,
+    executor: Optional[Executor] = None,
+    executors: Optional[Dict[str, Executor]] = None,
+    resource_manager: Optional[ResourceManager] = None,
+    window: Optional[int] = None,
+    tracer: Optional[Tracer] = None,
+    metrics: Optional[Registry] = None,
+    profiler: Optional[Profiler] = None,
+    checkpoint: Optional[str] = None,
+):
+    if func is None:
+        return functools.partial(
+            desync,
+            executor=executor,
+            executors=executors,
+            resource_manager=resource_manager,
+            window=window,
+            tracer=tracer,
+            metrics=metrics,
+            profiler=profiler,
+            checkpoint=checkpoint,
+        )
+    return Desync(func, executor, executors, resource_manager, window, tracer, metrics, profiler, checkpoint)
@@ -0,0 +1,162 @@
+import atexit
+import os
+import pickle
+import queue
+import sqlite3
+import threading
+
+from typing import Any, Dict, Optional, Tuple
+
+
+class DiskCache:
+    def __init__(self, directory: str):
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], Tuple[bytes, Optional[float]]] = {}
+        self._queue = queue.Queue()
+        self._writer = None
+        self._nbytes = None
+        self._error = None
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS outputs ('
+                ' func_hash TEXT, input_hash TEXT, filename TEXT, PRIMARY KEY (func_hash, input_hash))'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS costs ('
+                ' func_hash TEXT, input_hash TEXT, cost REAL, PRIMARY KEY (func_hash, input_hash))'
+            )
+
+    def __getstate__(self):
+        self.flush()
+        return {'directory': self._directory}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'])
+
+    def set_outputs(
+        self,
+        func_hash: int,
+        input_hash: int,
+        outputs: Any,
+        cost: Optional[float] = None,
+        immutable: bool = False,
+    ):
+        key = (str(func_hash), str(input_hash))
+        data = pickle.dumps(outputs, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._pending[key] = (data, cost)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write, daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+        self._queue.put(key)
+
+    def flush(self):
+        self._queue.join()
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def get_outputs(self, func_hash, input_hash):
+        with self._lock:
+            pending = self._pending.get((str(func_hash), str(input_hash)))
+        if pending is not None:
+            return pickle.loads(pending[0])
+        filename = self._get_filename(func_hash, input_hash)
+        if filename is None:
+            return None
+        with open(os.path.join(self._directory, filename), 'rb') as fileobj:
+            return pickle.load(fileobj)
+
+    def has_outputs(self, func_hash, input_hash):
+        with self._lock:
+            if (str(func_hash), str(input_hash)) in self._pending:
+                return True
+        return self._get_filename(func_hash, input_hash) is not None
+
+    def get_cost(self, func_hash, input_hash) -> Optional[float]:
+        key = (str(func_hash), str(input_hash))
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key][1]
+            row = self._connection.execute('SELECT cost FROM costs WHERE func_hash = ? AND input_hash = ?', key).fetchone()
+        return None if row is None else row[0]
+
+    def get_nbytes(self) -> int:
+        with self._lock:
+            if self._nbytes is None:
+                rows = self._connection.execute('SELECT filename FROM outputs').fetchall()
+                self._nbytes = sum(os.path.getsize(os.path.join(self._directory, filename)) for filename, in rows)
+            return self._nbytes + sum(len(data) for data, _ in self._pending.values())
+
+    def _write(self):
+        while True:
+            keys = [self._queue.get()]
+            while True:
+                try:
+                    keys.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(keys)
+            except Exception as error:
+                with self._lock:
+                    self._error = error
+            finally:
+                for _ in keys:
+                    self._queue.task_done()
+
+    def _write_batch(self, keys):
+        written = {}
+        failed = {}
+        for key in keys:
+            with self._lock:
+                pending = self._pending.get(key)
+            if pending is None or key in written or key in failed:
+                continue
+            filename = f'{key[0]}-{key[1]}.pickle'
+            path = os.path.join(self._directory, filename)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            try:
+                with open(tmp_path, 'wb') as fileobj:
+                    fileobj.write(pending[0])
+                old_size = os.path.getsize(path) if os.path.isfile(path) else 0
+                os.replace(tmp_path, path)
+            except OSError as error:
+                failed[key] = pending
+                with self._lock:
+                    self._error = error
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                continue
+            written[key] = (filename, pending, len(pending[0]) - old_size)
+        try:
+            with self._lock, self._connection:
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO outputs VALUES (?, ?, ?)',
+                    [(func_hash, input_hash, filename) for (func_hash, input_hash), (filename, _, _) in written.items()],
+                )
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO costs VALUES (?, ?, ?)',
+                    [key + (cost,) for key, (_, (_, cost), _) in written.items() if cost is not None],
+                )
+                if self._nbytes is not None:
+                    self._nbytes += sum(nbytes for _, _, nbytes in written.values())
+        finally:
+            with self._lock:
+                finished = list(failed.items()) + [(key, pending) for key, (_, pending, _) in written.items()]
+                for key, pending in finished:
+                    if self._pending.get(key) is pending:
+                        del self._pending[key]
+
+    def _get_filename(self, func_hash, input_hash):
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT filename FROM outputs WHERE func_hash = ? AND input_hash = ?',
+                (str(func_hash), str(input_hash)),
+            ).fetchone()
+        return None if row is None else row[0]
@@ -0,0 +1,390 @@
+import argparse
+import collections
+import functools
+import hmac
+import itertools
+import os
+import pickle
+import socket
+import struct
+import threading
+import weakref
+
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from desync.hashtools import InputHasher
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+HEADER = struct.Struct('!Q')
+CHALLENGE_SIZE = 32
+HANDSHAKE_TIMEOUT = 10.0
+WELCOME = b'#WELCOME#'
+FAILURE = b'#FAILURE#'
+
+
+class Ref:
+    def __init__(self, digest: bytes):
+        self.digest = digest
+
+
+class Task:
+    def __init__(self, task_id: int, func: Callable, args: Sequence, kwargs: Dict[str, Any], future: Future):
+        self.id = task_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+
+
+class Connection:
+    def __init__(self, sock: socket.socket, capacity: int):
+        self.socket = sock
+        self.capacity = capacity
+        self.running: Dict[int, Task] = {}
+        self.alive = True
+        self._lock = threading.Lock()
+
+    @property
+    def free(self) -> int:
+        return self.capacity - len(self.running) if self.alive else 0
+
+    def send(self, message):
+        with self._lock:
+            send_message(self.socket, message)
+
+
+class DistributedExecutor(Executor):
+    def __init__(
+        self,
+        addresses: Sequence[Tuple[str, int]],
+        max_locations: int = 1024,
+        authkey: Optional[bytes] = None,
+    ):
+        authkey = get_authkey(authkey)
+        self._lock = threading.Lock()
+        self._queue = collections.deque()
+        self._counter = itertools.count()
+        self._locations = collections.OrderedDict()
+        self._max_locations = max_locations
+        self._connections: List[Connection] = []
+        for address in addresses:
+            sock = socket.create_connection(address, timeout=HANDSHAKE_TIMEOUT)
+            try:
+                answer_challenge(sock, authkey)
+                deliver_challenge(sock, authkey)
+                sock.settimeout(None)
+                _, capacity = recv_message(sock)
+            except BaseException:
+                sock.close()
+                raise
+            connection = Connection(sock, capacity)
+            self._connections.append(connection)
+            threading.Thread(target=self._receive, args=(connection,), daemon=True).start()
+        self._max_workers = sum(connection.capacity for connection in self._connections)
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        if isinstance(fn, functools.partial) and len(args) == 0 and len(kwargs) == 0:
+            fn, args, kwargs = fn.func, fn.args, fn.keywords
+        future = Future()
+        with self._lock:
+            self._queue.append(Task(next(self._counter), fn, args, kwargs, future))
+            sends = self._dispatch()
+        self._send(sends)
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._lock:
+            connections = list(self._connections)
+            for connection in connections:
+                connection.alive = False
+        for connection in connections:
+            connection.socket.close()
+
+    def _dispatch(self) -> List[Tuple[Connection, Task, Dict[int, bytes]]]:
+        sends = []
+        while len(self._queue) > 0:
+            task = self._queue[0]
+            connection, refs = self._choose(task)
+            if connection is None:
+                if all(not connection.alive for connection in self._connections):
+                    self._queue.popleft()
+                    task.future.set_exception(RuntimeError('no distributed workers are available'))
+                    continue
+                break
+            self._queue.popleft()
+            if not task.future.set_running_or_notify_cancel():
+                continue
+            connection.running[task.id] = task
+            sends.append((connection, task, refs))
+        return sends
+
+    def _choose(self, task: Task):
+        values = list(task.args) + list(task.kwargs.values())
+        best = None
+        best_refs = {}
+        for connection in self._connections:
+            if connection.free <= 0:
+                continue
+            refs = {}
+            for value in values:
+                location = self._locations.get(id(value))
+                if location is not None and get_referent(location[0]) is value and location[2] is connection:
+                    refs[id(value)] = location[1]
+            if best is None or (len(refs), connection.free) > (len(best_refs), best.free):
+                best = connection
+                best_refs = refs
+        return best, best_refs
+
+    def _send(self, sends: List[Tuple[Connection, Task, Dict[int, bytes]]]):
+        while len(sends) > 0:
+            connection, task, refs = sends.pop(0)
+            if not connection.alive:
+                continue
+            args = [Ref(refs[id(arg)]) if id(arg) in refs else arg for arg in task.args]
+            kwargs = {key: Ref(refs[id(value)]) if id(value) in refs else value for key, value in task.kwargs.items()}
+            try:
+                connection.send(('submit', task.id, task.func, args, kwargs))
+            except OSError:
+                with self._lock:
+                    self._disconnect(connection)
+                    sends.extend(self._dispatch())
+            except (pickle.PicklingError, AttributeError, TypeError) as error:
+                with self._lock:
+                    connection.running.pop(task.id, None)
+                    sends.extend(self._dispatch())
+                task.future.set_exception(error)
+
+    def _receive(self, connection: Connection):
+        while True:
+            try:
+                message = recv_message(connection.socket)
+            except (OSError, EOFError):
+                with self._lock:
+                    self._disconnect(connection)
+                    sends = self._dispatch()
+                self._send(sends)
+                return
+            with self._lock:
+                task = connection.running.pop(message[1], None)
+                if task is not None and message[0] == 'missing':
+                    connection.running[task.id] = task
+                    sends = [(connection, task, {})]
+                else:
+                    if task is not None and message[0] == 'result':
+                        self._locate(message[2], message[3], connection)
+                    sends = self._dispatch()
+            self._send(sends)
+            if task is None or message[0] == 'missing':
+                continue
+            elif message[0] == 'result':
+                task.future.set_result(message[2])
+            else:
+                task.future.set_exception(message[2])
+
+    def _locate(self, value: Any, digest: bytes, connection: Connection):
+        try:
+            referent = weakref.ref(value)
+        except TypeError:
+            referent = value
+        self._locations[id(value)] = (referent, digest, connection)
+        self._locations.move_to_end(id(value))
+        while len(self._locations) > self._max_locations:
+            self._locations.popitem(last=False)
+
+    def _disconnect(self, connection: Connection):
+        if not connection.alive and len(connection.running) == 0:
+            return
+        connection.alive = False
+        for key, (_, _, location) in list(self._locations.items()):
+            if location is connection:
+                del self._locations[key]
+        for task in connection.running.values():
+            future = Future()
+            future.add_done_callback(functools.partial(copy_future, task.future))
+            task.future = future
+            self._queue.appendleft(task)
+        connection.running.clear()
+
+
+class Worker:
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        capacity: Optional[int] = None,
+        store_size: int = 1024,
+        authkey: Optional[bytes] = None,
+    ):
+        self._authkey = get_authkey(authkey)
+        self.capacity = (os.cpu_count() or 1) if capacity is None else capacity
+        self.ref_hits = 0
+        self._store = collections.OrderedDict()
+        self._store_size = store_size
+        self._store_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(self.capacity)
+        self._server = socket.create_server((host, port))
+        self._clients: List[socket.socket] = []
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.getsockname()[:2]
+
+    def start(self) -> 'Worker':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            self._clients.append(client)
+            threading.Thread(target=self._serve, args=(Connection(client, self.capacity),), daemon=True).start()
+
+    def shutdown(self):
+        self._server.close()
+        for client in self._clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.close()
+
+    def _serve(self, connection: Connection):
+        try:
+            connection.socket.settimeout(HANDSHAKE_TIMEOUT)
+            deliver_challenge(connection.socket, self._authkey)
+            answer_challenge(connection.socket, self._authkey)
+            connection.socket.settimeout(None)
+            connection.send(('hello', self.capacity))
+        except (OSError, EOFError, AuthenticationError):
+            connection.socket.close()
+            return
+        while True:
+            try:
+                _, task_id, func, args, kwargs = recv_message(connection.socket)
+            except (OSError, EOFError):
+                return
+            try:
+                args = [self._load(arg) for arg in args]
+                kwargs = {key: self._load(value) for key, value in kwargs.items()}
+            except KeyError:
+                connection.send(('missing', task_id))
+                continue
+            self._executor.submit(self._run, connection, task_id, func, args, kwargs)
+
+    def _run(self, connection: Connection, task_id: int, func: Callable, args: Sequence, kwargs: Dict[str, Any]):
+        try:
+            result = func(*args, **kwargs)
+            hasher = InputHasher()
+            hasher.hash(result)
+            digest = hasher.digest()
+            with self._store_lock:
+                self._store[digest] = result
+                self._store.move_to_end(digest)
+                while len(self._store) > self._store_size:
+                    self._store.popitem(last=False)
+            message = ('result', task_id, result, digest)
+        except Exception as error:
+            message = ('error', task_id, error)
+        try:
+            try:
+                connection.send(message)
+            except (pickle.PicklingError, AttributeError, TypeError) as error:
+                connection.send(('error', task_id, RuntimeError(f'could not send result: {error!r}')))
+        except OSError:
+            pass
+
+    def _load(self, value):
+        if not isinstance(value, Ref):
+            return value
+        with self._store_lock:
+            value = self._store[value.digest]
+            self.ref_hits += 1
+        return value
+
+
+def copy_future(target: Future, source: Future):
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def get_referent(referent):
+    return referent() if isinstance(referent, weakref.ref) else referent
+
+
+def get_authkey(authkey: Optional[bytes] = None) -> bytes:
+    if authkey is None:
+        authkey = os.environ.get('DESYNC_AUTHKEY', '').encode()
+    if len(authkey) == 0:
+        raise ValueError('a shared authkey is required, pass authkey or set DESYNC_AUTHKEY')
+    return authkey
+
+
+def deliver_challenge(sock: socket.socket, authkey: bytes):
+    challenge = os.urandom(CHALLENGE_SIZE)
+    send_bytes(sock, challenge)
+    digest = recv_bytes(sock, 64)
+    if not hmac.compare_digest(digest, hmac.new(authkey, challenge, 'sha256').digest()):
+        send_bytes(sock, FAILURE)
+        raise AuthenticationError('digest received was wrong')
+    send_bytes(sock, WELCOME)
+
+
+def answer_challenge(sock: socket.socket, authkey: bytes):
+    challenge = recv_bytes(sock, CHALLENGE_SIZE)
+    send_bytes(sock, hmac.new(authkey, challenge, 'sha256').digest())
+    if recv_bytes(sock, len(WELCOME)) != WELCOME:
+        raise AuthenticationError('digest sent was rejected')
+
+
+def send_bytes(sock: socket.socket, data: bytes):
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def recv_bytes(sock: socket.socket, max_size: int) -> bytes:
+    size, = HEADER.unpack(recv_exactly(sock, HEADER.size))
+    if size > max_size:
+        raise AuthenticationError(f'expected at most {max_size} bytes during the handshake, got {size}')
+    return recv_exactly(sock, size)
+
+
+def send_message(sock: socket.socket, message):
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock: socket.socket):
+    size, = HEADER.unpack(recv_exactly(sock, HEADER.size))
+    return pickle.loads(recv_exactly(sock, size))
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 1 << 20))
+        if len(chunk) == 0:
+            raise EOFError('connection closed')
+        data.extend(chunk)
+    return bytes(data)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description='Run steps sent by a desync DistributedExecutor.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--capacity', type=int, default=None)
+    args = parser.parse_args(argv)
+    worker = Worker(args.host, args.port, args.capacity)
+    print('{}:{}'.format(*worker.address), flush=True)
+    worker.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
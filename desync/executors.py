@@ -0,0 +1,27 @@
+import importlib
+import os
+
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Optional, Sequence
+
+
+def process_pool(
+    max_workers: Optional[int] = None,
+    *,
+    preload: Sequence[str] = (),
+    mp_context=None,
+) -> ProcessPoolExecutor:
+    max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+    executor = ProcessPoolExecutor(
+        max_workers,
+        mp_context=mp_context,
+        initializer=import_modules,
+        initargs=(tuple(preload),),
+    )
+    wait([executor.submit(os.getpid) for _ in range(max_workers)])
+    return executor
+
+
+def import_modules(modules: Sequence[str]):
+    for module in modules:
+        importlib.import_module(module)
@@ -1,7 +1,7 @@
 import ast
 import inspect
 
-from desync.hashtools import hash_function
+from desync.hashtools import FUNCTION_HASHES, hash_function, resolve_reference
 from typing import Callable
 
 
@@ -29,27 +29,27 @@ class Function:
         return inspect.getmodule(self._func)
 
     def get_hash(self) -> int:
+        return FUNCTION_HASHES.get_hash(self._func)
+
+    def get_fingerprint(self) -> int:
         return hash_function(self._func)
 
     def get_step_hashes(self):
         module = self.get_ast()
+        namespace = inspect.getmodule(self._func).__dict__
 
         step_hashes = []
-        stack = module.body[:]
-        while len(stack) > 0:
-            top = stack.pop(0)
-            if isinstance(top, (ast.Assign, ast.Return)):
-                stack.append(top.value)
-            elif isinstance(top, ast.Attribute):
-                stack.append(top.value)
-            elif isinstance(top, ast.FunctionDef):
-                stack.extend(top.body)
-            elif isinstance(top, ast.ListComp):
-                stack.append(top.elt)
-            elif isinstance(top, ast.Call) and hasattr(top.func, 'id'):
-                func = inspect.getmodule(self._func).__dict__[top.func.id]
-                if type(func).__name__ == 'Desync':
-                    step_hashes.extend(func.get_version().minor_hash)
-                elif not inspect.isbuiltin(func):
+        for node in ast.walk(module):
+            reference = resolve_reference(node.func, namespace) if isinstance(node, ast.Call) else None
+            if reference is None:
+                continue
+            func = reference[1]
+            if type(func).__name__ == 'Desync':
+                step_hashes.append(func.get_version().major_hash)
+                step_hashes.extend(func.get_version().minor_hash)
+            elif callable(func) and not inspect.isbuiltin(func) and not isinstance(func, type):
+                try:
                     step_hashes.append(hash_function(func))
+                except TypeError:
+                    continue
         return tuple(sorted(step_hashes))
@@ -0,0 +1,84 @@
+import ast
+
+from typing import Dict, Optional, Set
+
+
+class DataflowGraph:
+    def __init__(self, tree: ast.AST):
+        self._downstream: Dict[ast.Call, Set[ast.Call]] = {}
+        self._producers: Dict[str, Set[ast.Call]] = {}
+        self._visit(tree)
+
+    def get_downstream(self, call: ast.Call) -> Set[ast.Call]:
+        return self._downstream[call]
+
+    def prioritise(self, durations: Optional[Dict[str, float]] = None):
+        durations = {} if durations is None else durations
+        default = sum(durations.values()) / len(durations) if len(durations) > 0 else 1.0
+        priorities = {}
+        for call in self._downstream:
+            self._get_priority(call, durations, default, priorities)
+        for call, priority in priorities.items():
+            call.priority = priority
+
+    def _get_priority(self, call, durations, default, priorities):
+        if call in priorities:
+            return priorities[call]
+        priorities[call] = 0.0
+        downstream = [self._get_priority(child, durations, default, priorities) for child in self._downstream[call]]
+        priorities[call] = durations.get(get_name(call), default) + max(downstream, default=0.0)
+        return priorities[call]
+
+    def _visit(self, node: ast.AST) -> Set[ast.Call]:
+        if isinstance(node, ast.Name):
+            return set(self._producers.get(node.id, ()))
+        elif isinstance(node, ast.Call):
+            upstream = self._visit_children(node)
+            self._downstream.setdefault(node, set())
+            for call in upstream:
+                self._downstream[call].add(node)
+            return {node}
+        elif isinstance(node, ast.Assign):
+            upstream = self._visit(node.value)
+            for target in node.targets:
+                self._bind(target, upstream)
+            return upstream
+        elif isinstance(node, (ast.DictComp, ast.GeneratorExp, ast.ListComp, ast.SetComp)):
+            for generator in node.generators:
+                self._bind(generator.target, self._visit(generator.iter))
+                for if_ in generator.ifs:
+                    self._visit(if_)
+            upstream = set()
+            elts = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+            for elt in elts:
+                upstream |= self._visit(elt)
+            return upstream
+        elif isinstance(node, ast.For):
+            self._bind(node.target, self._visit(node.iter))
+            for statement in node.body + node.orelse:
+                self._visit(statement)
+            return set()
+        return self._visit_children(node)
+
+    def _visit_children(self, node: ast.AST) -> Set[ast.Call]:
+        upstream = set()
+        for child in ast.iter_child_nodes(node):
+            upstream |= self._visit(child)
+        return upstream
+
+    def _bind(self, target: ast.AST, upstream: Set[ast.Call]):
+        if isinstance(target, ast.Name):
+            self._producers[target.id] = set(upstream)
+        elif isinstance(target, (ast.List, ast.Tuple)):
+            for elt in target.elts:
+                self._bind(elt, upstream)
+        elif isinstance(target, ast.Starred):
+            self._bind(target.value, upstream)
+
+
+def get_name(call: ast.Call) -> Optional[str]:
+    if isinstance(call.func, ast.Name):
+        return call.func.id
+    elif isinstance(call.func, ast.Attribute):
+        return call.func.attr
+    return None
@@ -1,11 +1,337 @@
 import ast
+import atexit
+import dataclasses
+import functools
+import hashlib
+import importlib.util
 import inspect
+import os
+import pickle
+import struct
+import sys
+import sysconfig
+import textwrap
+import threading
 import zlib
 
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+
+CONSTANT_TYPES = (str, bytes, int, float, complex, bool, type(None))
+CONTAINER_TYPES = (tuple, list, set, frozenset)
+LIBRARY_PATHS = tuple(sorted({
+    os.path.realpath(path) + os.sep
+    for key, path in sysconfig.get_paths().items()
+    if key in ('stdlib', 'platstdlib', 'purelib', 'platlib')
+}))
+
+
+class FingerprintIndex:
+    def __init__(self, filename: Optional[str] = None):
+        self._filename = filename
+        self._entries: Dict[Tuple[str, str, str, int], Tuple] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if filename is not None and os.path.exists(filename):
+            with open(filename, 'rb') as fileobj:
+                self._entries = pickle.load(fileobj)
+        if filename is not None:
+            atexit.register(self.save)
+
+    def get(self, kind: str, func: Callable) -> Optional[Tuple[int, Set[str], FrozenSet[Tuple[str, str, bytes]]]]:
+        with self._lock:
+            entry = self._entries.get(get_index_key(kind, func))
+        if entry is None or len(entry) < 3 or any(get_mtime(filename) != mtime for filename, mtime in entry[1]):
+            return None
+        if any(get_constant_digest(module, name) != digest for module, name, digest in entry[2]):
+            return None
+        return entry[0], {filename for filename, _ in entry[1]}, frozenset(entry[2])
+
+    def set(self, kind: str, func: Callable, hash_: int, filenames: Set[str], constants: FrozenSet[Tuple[str, str, bytes]] = frozenset()):
+        if self._filename is None:
+            return
+        with self._lock:
+            self._entries[get_index_key(kind, func)] = (
+                hash_,
+                tuple((filename, get_mtime(filename)) for filename in sorted(filenames)),
+                tuple(sorted(constants)),
+            )
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if self._filename is None or not self._dirty:
+                return
+            tmp_filename = f'{self._filename}.{os.getpid()}.tmp'
+            with open(tmp_filename, 'wb') as fileobj:
+                pickle.dump(self._entries, fileobj)
+            os.replace(tmp_filename, self._filename)
+            self._dirty = False
+
+
+FINGERPRINT_INDEX = FingerprintIndex()
+
+
+def set_fingerprint_index(filename: Optional[str]):
+    global FINGERPRINT_INDEX
+    FINGERPRINT_INDEX.save()
+    FINGERPRINT_INDEX = FingerprintIndex(filename)
+
+
+def get_index_key(kind: str, func: Callable) -> Tuple[str, str, str, int]:
+    return kind, os.path.abspath(func.__code__.co_filename), func.__qualname__, func.__code__.co_firstlineno
+
+
+class FunctionHashRegistry:
+    def __init__(self):
+        self._hashes: Dict[Tuple, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_hash(self, func: Callable) -> int:
+        code = getattr(func, '__code__', None)
+        if code is None:
+            return hash_source(func)
+        key = (code, get_mtime(code.co_filename))
+        with self._lock:
+            if key in self._hashes:
+                self.hits += 1
+                return self._hashes[key]
+        entry = FINGERPRINT_INDEX.get('source', func)
+        if entry is None:
+            hash_ = hash_source(func)
+            FINGERPRINT_INDEX.set('source', func, hash_, {code.co_filename})
+        else:
+            hash_ = entry[0]
+        with self._lock:
+            self.misses += 1
+            self._hashes[key] = hash_
+        return hash_
+
+    def clear(self):
+        with self._lock:
+            self._hashes.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class FingerprintRegistry:
+    def __init__(self):
+        self._fingerprints: Dict[Tuple, Tuple[int, Optional[Set[str]], FrozenSet[Tuple[str, str, bytes]]]] = {}
+        self._lock = threading.Lock()
+
+    def get_fingerprint(self, func: Callable) -> int:
+        return self._get_fingerprint(func, frozenset())[0]
+
+    def clear(self):
+        with self._lock:
+            self._fingerprints.clear()
+
+    def _get_fingerprint(self, func: Callable, active: frozenset) -> Tuple[int, Optional[Set[str]], FrozenSet[Tuple[str, str, bytes]]]:
+        code = getattr(func, '__code__', None)
+        if code is None:
+            return FUNCTION_HASHES.get_hash(func), None, frozenset()
+        key = (code, get_mtime(code.co_filename))
+        with self._lock:
+            if key in self._fingerprints:
+                return self._fingerprints[key]
+        entry = FINGERPRINT_INDEX.get('fingerprint', func)
+        if entry is None:
+            entry = self._compute_fingerprint(func, active | {code})
+            if entry[1] is not None:
+                FINGERPRINT_INDEX.set('fingerprint', func, *entry)
+        with self._lock:
+            self._fingerprints[key] = entry
+        return entry
+
+    def _compute_fingerprint(self, func: Callable, active: frozenset) -> Tuple[int, Optional[Set[str]], FrozenSet[Tuple[str, str, bytes]]]:
+        filenames = {func.__code__.co_filename}
+        constants = set()
+        hasher = InputHasher()
+        hasher.hash(FUNCTION_HASHES.get_hash(func))
+        for name, value in get_references(func):
+            callee = getattr(value, '__code__', None)
+            if type(value).__name__ == 'Desync':
+                hasher.hash((name, value.get_hash()))
+                filenames = None
+            elif callee is not None and is_project_object(value):
+                if callee in active:
+                    fingerprint, callee_filenames = FUNCTION_HASHES.get_hash(value), {callee.co_filename}
+                else:
+                    fingerprint, callee_filenames, callee_constants = self._get_fingerprint(value, active)
+                    constants |= callee_constants
+                hasher.hash((name, fingerprint))
+                filenames = None if filenames is None or callee_filenames is None else filenames | callee_filenames
+            elif isinstance(value, type) and is_project_object(value):
+                try:
+                    hasher.hash((name, hash_source(value)))
+                except (OSError, TypeError):
+                    continue
+                if filenames is not None:
+                    filenames.add(inspect.getfile(value))
+            elif is_constant(value):
+                hasher.hash((name, value))
+                constants.add((func.__globals__.get('__name__'), name, get_digest(value)))
+                constant_filenames = get_constant_filenames(func, name)
+                filenames = None if filenames is None or constant_filenames is None else filenames | constant_filenames
+        return hasher.intdigest(), filenames, frozenset(constants)
+
+
+FUNCTION_HASHES = FunctionHashRegistry()
+FINGERPRINTS = FingerprintRegistry()
+
 
 def hash_function(func):
-    tree = ast.parse(inspect.getsource(func))
-    assert len(tree.body) == 1 and isinstance(tree.body[0], (ast.FunctionDef, ast.AsyncFunctionDef))
+    return FINGERPRINTS.get_fingerprint(func)
+
+
+def is_constant(value, active: frozenset = frozenset()) -> bool:
+    if id(value) in active:
+        return False
+    elif isinstance(value, dict):
+        return all(is_constant(key, active | {id(value)}) and is_constant(item, active | {id(value)})
+                   for key, item in value.items())
+    elif isinstance(value, CONTAINER_TYPES):
+        return all(is_constant(item, active | {id(value)}) for item in value)
+    return isinstance(value, CONSTANT_TYPES)
+
+
+def get_references(func: Callable) -> List[Tuple[str, Any]]:
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(func)))
+    except (OSError, TypeError, SyntaxError):
+        return []
+    namespace = dict(getattr(func, '__globals__', {}))
+    for name, cell in zip(func.__code__.co_freevars, func.__closure__ or ()):
+        try:
+            namespace[name] = cell.cell_contents
+        except ValueError:
+            pass
+    references = {}
+    for node in ast.walk(tree):
+        reference = resolve_reference(node, namespace)
+        if reference is not None and reference[1] is not func:
+            references[reference[0]] = reference[1]
+    return sorted(references.items(), key=lambda item: item[0])
+
+
+def resolve_reference(node: ast.AST, namespace: Dict[str, Any]) -> Optional[Tuple[str, Any]]:
+    attrs = []
+    while isinstance(node, ast.Attribute):
+        attrs.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name) or node.id not in namespace:
+        return None
+    name = node.id
+    value = namespace[name]
+    for attr in reversed(attrs):
+        if not inspect.ismodule(value) or not hasattr(value, attr):
+            break
+        name = f'{name}.{attr}'
+        value = getattr(value, attr)
+    return name, value
+
+
+def get_constant_digest(module: str, name: str) -> Optional[bytes]:
+    head, *attrs = name.split('.')
+    namespace = getattr(sys.modules.get(module), '__dict__', {})
+    if head not in namespace:
+        return None
+    value = namespace[head]
+    for attr in attrs:
+        if not hasattr(value, attr):
+            return None
+        value = getattr(value, attr)
+    return get_digest(value)
+
+
+def get_digest(value: Any) -> bytes:
+    hasher = InputHasher()
+    hasher.hash(value)
+    return hasher.digest()
+
+
+def get_constant_filenames(func: Callable, name: str) -> Optional[Set[str]]:
+    head, *attrs = name.split('.')
+    if head in func.__code__.co_freevars:
+        return None
+    elif len(attrs) == 0:
+        return get_global_filenames(inspect.getmodule(func), head, frozenset())
+    module = func.__globals__.get(head)
+    for attr in attrs[:-1]:
+        module = getattr(module, attr, None)
+    return get_global_filenames(module, attrs[-1], frozenset())
+
+
+def get_global_filenames(module: Any, name: str, active: frozenset) -> Optional[Set[str]]:
+    if not inspect.ismodule(module) or module.__name__ in active:
+        return None
+    filename = getattr(module, '__file__', None)
+    if filename is None:
+        return set() if module.__name__ in sys.builtin_module_names else None
+    elif os.path.realpath(filename).startswith(LIBRARY_PATHS):
+        return set()
+    owner = get_global_owners(filename, get_mtime(filename), module.__package__ or '').get(name)
+    if owner is None:
+        return None
+    elif owner[0] == '':
+        return {filename}
+    filenames = get_global_filenames(sys.modules.get(owner[0]), owner[1], active | {module.__name__})
+    return None if filenames is None else filenames | {filename}
+
+
+@functools.lru_cache(maxsize=256)
+def get_global_owners(filename: str, mtime: Optional[int], package: str) -> Dict[str, Optional[Tuple[str, str]]]:
+    try:
+        with open(filename, 'rb') as fileobj:
+            tree = ast.parse(fileobj.read())
+    except (OSError, SyntaxError, ValueError):
+        return {}
+    owners = {}
+
+    def bind(name, owner):
+        owners[name] = owner if owners.get(name, owner) == owner else None
+
+    statements = list(tree.body)
+    while len(statements) > 0:
+        statement = statements.pop()
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        elif isinstance(statement, ast.ImportFrom):
+            try:
+                module = importlib.util.resolve_name('.' * statement.level + (statement.module or ''), package)
+            except (ImportError, ValueError):
+                module = None
+            for alias in statement.names:
+                if alias.name == '*':
+                    return {}
+                bind(alias.asname or alias.name, None if module is None else (module, alias.name))
+            continue
+        for node in ast.iter_child_nodes(statement):
+            if isinstance(node, ast.stmt):
+                statements.append(node)
+            elif isinstance(node, ast.excepthandler):
+                statements.extend(node.body)
+        targets = getattr(statement, 'targets', None) or [getattr(statement, 'target', None)]
+        for target in targets:
+            for node in ast.walk(target) if target is not None else ():
+                if isinstance(node, ast.Name):
+                    bind(node.id, ('', node.id))
+    return owners
+
+
+def is_project_object(value: Any) -> bool:
+    module = sys.modules.get(getattr(value, '__module__', None) or '')
+    filename = getattr(module, '__file__', None)
+    if filename is None:
+        return False
+    return not os.path.realpath(filename).startswith(LIBRARY_PATHS)
+
+
+def hash_source(func):
+    tree = ast.parse(textwrap.dedent(inspect.getsource(func)))
+    assert len(tree.body) == 1 and isinstance(tree.body[0], (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
     tree.body[0].name = ''
     for node in ast.walk(tree):
         remove_docstring(node)
@@ -13,9 +339,179 @@ def hash_function(func):
     return zlib.adler32(ast_str.encode('ascii'))
 
 
+class InputHasher:
+    def __init__(self):
+        self._digest = hashlib.blake2b(digest_size=16)
+        self._active = set()
+
+    def update(self, data):
+        self._digest.update(data)
+
+    def update_tag(self, tag: bytes, size: int = 0):
+        self._digest.update(tag + struct.pack('<Q', size))
+
+    def hash(self, value: Any):
+        key = id(value)
+        if key in self._active:
+            self.update_tag(b'cycle')
+            return
+        self._active.add(key)
+        try:
+            hash_value(value, self)
+        finally:
+            self._active.discard(key)
+
+    def hash_unordered(self, values):
+        digests = []
+        for value in values:
+            hasher = InputHasher()
+            hasher._active = self._active
+            hasher.hash(value)
+            digests.append(hasher.digest())
+        for digest in sorted(digests):
+            self.update(digest)
+
+    def digest(self) -> bytes:
+        return self._digest.digest()
+
+    def intdigest(self) -> int:
+        return int.from_bytes(self.digest(), 'big')
+
+
+@functools.singledispatch
+def hash_value(value, hasher: InputHasher):
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        hash_dataclass(value, hasher)
+        return
+    try:
+        view = memoryview(value)
+    except TypeError:
+        view = None
+    if view is not None:
+        hash_buffer(type(value), view, hasher)
+        return
+    try:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        data = repr(value).encode('utf-8', 'backslashreplace')
+    hash_qualname(type(value), hasher)
+    hasher.update_tag(b'object', len(data))
+    hasher.update(data)
+
+
+def register_hasher(type_: type, hasher: Optional[Callable[[Any, InputHasher], None]] = None):
+    return hash_value.register(type_, hasher)
+
+
+@hash_value.register(type(None))
+def hash_none(value, hasher: InputHasher):
+    hasher.update_tag(b'none')
+
+
+@hash_value.register(bool)
+def hash_bool(value, hasher: InputHasher):
+    hasher.update_tag(b'bool', value)
+
+
+@hash_value.register(int)
+def hash_int(value, hasher: InputHasher):
+    data = value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True)
+    hasher.update_tag(b'int', len(data))
+    hasher.update(data)
+
+
+@hash_value.register(float)
+def hash_float(value, hasher: InputHasher):
+    hasher.update_tag(b'float')
+    hasher.update(struct.pack('<d', value))
+
+
+@hash_value.register(complex)
+def hash_complex(value, hasher: InputHasher):
+    hasher.update_tag(b'complex')
+    hasher.update(struct.pack('<dd', value.real, value.imag))
+
+
+@hash_value.register(str)
+def hash_str(value, hasher: InputHasher):
+    data = value.encode('utf-8', 'surrogatepass')
+    hasher.update_tag(b'str', len(data))
+    hasher.update(data)
+
+
+@hash_value.register(bytes)
+@hash_value.register(bytearray)
+def hash_bytes(value, hasher: InputHasher):
+    hasher.update_tag(b'bytes', len(value))
+    hasher.update(value)
+
+
+@hash_value.register(memoryview)
+def hash_memoryview(value, hasher: InputHasher):
+    hash_buffer(memoryview, value, hasher)
+
+
+@hash_value.register(list)
+@hash_value.register(tuple)
+def hash_sequence(value, hasher: InputHasher):
+    hasher.update_tag(b'list' if isinstance(value, list) else b'tuple', len(value))
+    for item in value:
+        hasher.hash(item)
+
+
+@hash_value.register(range)
+def hash_range(value, hasher: InputHasher):
+    hasher.update_tag(b'range')
+    for item in (value.start, value.stop, value.step):
+        hasher.hash(item)
+
+
+@hash_value.register(set)
+@hash_value.register(frozenset)
+def hash_set(value, hasher: InputHasher):
+    hasher.update_tag(b'set', len(value))
+    hasher.hash_unordered(value)
+
+
+@hash_value.register(dict)
+def hash_dict(value, hasher: InputHasher):
+    hasher.update_tag(b'dict', len(value))
+    hasher.hash_unordered(value.items())
+
+
+def hash_dataclass(value, hasher: InputHasher):
+    fields = dataclasses.fields(value)
+    hash_qualname(type(value), hasher)
+    hasher.update_tag(b'dataclass', len(fields))
+    for field in fields:
+        hasher.hash(field.name)
+        hasher.hash(getattr(value, field.name))
+
+
+def hash_buffer(type_: type, view: memoryview, hasher: InputHasher):
+    hash_qualname(type_, hasher)
+    hasher.hash(view.format)
+    hasher.hash(view.shape)
+    hasher.update_tag(b'buffer', view.nbytes)
+    hasher.update(view if view.c_contiguous else view.tobytes())
+
+
+def hash_qualname(type_: type, hasher: InputHasher):
+    hasher.hash(f'{type_.__module__}.{type_.__qualname__}')
+
+
 def hash_input(args, kwargs):
-    hash_ = zlib.adler32(str(args).encode('ascii'))
-    return zlib.adler32(str(sorted(kwargs.items())).encode('ascii'), hash_)
+    hasher = InputHasher()
+    hasher.hash(tuple(args))
+    hasher.hash(dict(kwargs))
+    return hasher.intdigest()
+
+
+def get_mtime(filename):
+    try:
+        return os.stat(filename).st_mtime_ns
+    except OSError:
+        return None
 
 
 def remove_docstring(node: ast.AST):
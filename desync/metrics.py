@@ -0,0 +1,195 @@
+import bisect
+import functools
+import http.server
+import threading
+
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0, 300.0, float('inf'))
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str = ''):
+        self.name = name
+        self.help = help
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._functions: Dict[Tuple[Tuple[str, str], ...], Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def set_function(self, function: Callable[[], float], **labels):
+        self._functions[get_key(labels)] = function
+
+    def collect(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(key), value
+        for key, function in list(self._functions.items()):
+            yield self.name, dict(key), function()
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[get_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str = '', buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        if self.buckets[-1] != float('inf'):
+            self.buckets += (float('inf'),)
+
+    def observe(self, value: float, **labels):
+        key = get_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = [0] * len(self.buckets) + [0.0]
+            counts = self._values[key]
+            counts[index] += 1
+            counts[-1] += value
+
+    def collect(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            values = [(key, list(counts)) for key, counts in self._values.items()]
+        for key, counts in values:
+            total = 0
+            for bucket, count in zip(self.buckets, counts):
+                total += count
+                yield self.name + '_bucket', dict(key + (('le', format_value(bucket)),)), total
+            yield self.name + '_sum', dict(key), counts[-1]
+            yield self.name + '_count', dict(key), total
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str = '') -> Counter:
+        return self._register(Counter, name, help)
+
+    def gauge(self, name: str, help: str = '') -> Gauge:
+        return self._register(Gauge, name, help)
+
+    def histogram(self, name: str, help: str = '', buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, buckets)
+
+    def collect(self) -> List[Tuple[str, Dict[str, str], float]]:
+        return [sample for metric in list(self._metrics.values()) for sample in metric.collect()]
+
+    def get_sample_value(self, name: str, **labels) -> Optional[float]:
+        labels = {key: str(value) for key, value in labels.items()}
+        for sample_name, sample_labels, value in self.collect():
+            if sample_name == name and sample_labels == labels:
+                return value
+        return None
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.collect():
+                lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int = 9100, host: str = '127.0.0.1') -> http.server.ThreadingHTTPServer:
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                data = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def _register(self, type_, name, help, *args):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = type_(name, help, *args)
+            elif not isinstance(self._metrics[name], type_):
+                raise ValueError(f'metric {name} is already registered as a {self._metrics[name].type}')
+            return self._metrics[name]
+
+
+class StepMetrics:
+    def __init__(self, registry: Registry):
+        self.registry = registry
+        self.pending = registry.gauge('desync_steps_pending', 'Steps waiting for their inputs.')
+        self.running = registry.gauge('desync_steps_running', 'Steps waiting for or running on an executor.')
+        self.completed = registry.counter('desync_steps_completed_total', 'Steps that have finished.')
+        self.cache_hits = registry.counter('desync_cache_hits_total', 'Steps read from the old cache.')
+        self.cache_misses = registry.counter('desync_cache_misses_total', 'Steps that had to be run.')
+        self.latency = registry.histogram('desync_step_seconds', 'Time taken to run a step.')
+        registry.gauge('desync_cache_hit_ratio', 'Fraction of steps read from the old cache.').set_function(self.get_hit_ratio)
+
+    def watch_scheduler(self, scheduler):
+        self.registry.gauge('desync_queue_depth', 'Steps waiting for an executor slot.').set_function(scheduler.get_queue_depth)
+        gauge = self.registry.gauge('desync_resource_utilisation', 'Fraction of each resource in use.')
+        for resource in scheduler.get_resources():
+            gauge.set_function(functools.partial(scheduler.get_utilisation, resource), resource=resource)
+
+    def watch_cache(self, get_cache: Callable, **labels):
+        gauge = self.registry.gauge('desync_cache_bytes', 'Bytes held in the cache of new outputs.')
+        gauge.set_function(lambda: get_cache().get_nbytes(), **labels)
+
+    def get_hit_ratio(self) -> float:
+        hits = sum(value for _, _, value in self.cache_hits.collect())
+        misses = sum(value for _, _, value in self.cache_misses.collect())
+        return hits / (hits + misses) if hits + misses > 0 else 0.0
+
+
+def get_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if len(labels) == 0:
+        return ''
+    items = ','.join('{}="{}"'.format(key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                     for key, value in labels.items())
+    return '{' + items + '}'
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    elif value == float('-inf'):
+        return '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
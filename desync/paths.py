@@ -0,0 +1,94 @@
+import atexit
+import hashlib
+import os
+import pickle
+import threading
+
+from desync.hashtools import InputHasher, register_hasher
+from typing import Dict, Optional, Tuple
+
+
+CHUNK_SIZE = 1 << 20
+
+
+class Path(str):
+    pass
+
+
+class StatIndex:
+    def __init__(self, filename: Optional[str] = None):
+        self._filename = filename
+        self._digests: Dict[str, Tuple[Tuple[int, int, int], bytes]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if filename is not None and os.path.exists(filename):
+            with open(filename, 'rb') as fileobj:
+                self._digests = pickle.load(fileobj)
+        if filename is not None:
+            atexit.register(self.save)
+
+    def get_digest(self, path: str) -> bytes:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            entry = self._digests.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        digest = hash_file(path)
+        with self._lock:
+            self._digests[path] = (key, digest)
+            self._dirty = True
+        return digest
+
+    def save(self):
+        with self._lock:
+            if self._filename is None or not self._dirty:
+                return
+            tmp_filename = f'{self._filename}.{os.getpid()}.tmp'
+            with open(tmp_filename, 'wb') as fileobj:
+                pickle.dump(self._digests, fileobj)
+            os.replace(tmp_filename, self._filename)
+            self._dirty = False
+
+
+STAT_INDEX = StatIndex()
+
+
+def set_stat_index(filename: Optional[str]):
+    global STAT_INDEX
+    STAT_INDEX.save()
+    STAT_INDEX = StatIndex(filename)
+
+
+def hash_file(path: str) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as fileobj:
+        for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def hash_path(value, hasher: InputHasher):
+    path = os.fspath(value)
+    hasher.hash(path)
+    if os.path.isdir(path):
+        hasher.update_tag(b'directory')
+        for root, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                filename = os.path.join(root, filename)
+                hasher.hash(os.path.relpath(filename, path))
+                hasher.update(STAT_INDEX.get_digest(filename))
+    elif os.path.exists(path):
+        hasher.update_tag(b'file')
+        hasher.update(STAT_INDEX.get_digest(path))
+    else:
+        hasher.update_tag(b'missing')
+
+
+def register_path_type(type_: type):
+    register_hasher(type_, hash_path)
+
+
+register_path_type(Path)
@@ -0,0 +1,76 @@
+import cProfile
+import marshal
+import os
+import pstats
+import threading
+
+from typing import Callable, Dict, List, Optional
+
+
+class Profiler:
+    def __init__(self, every: int = 1):
+        if every < 1:
+            raise ValueError(f'every must be at least 1, got {every}')
+        self.every = every
+        self._calls: Dict[str, int] = {}
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._lock = threading.Lock()
+
+    def sample(self, func: Callable) -> bool:
+        name = get_name(func)
+        with self._lock:
+            calls = self._calls.get(name, 0)
+            self._calls[name] = calls + 1
+        return calls % self.every == 0
+
+    def add(self, func: Callable, data: Optional[bytes]):
+        if data is None:
+            return
+        stats = pstats.Stats(LoadedProfile(marshal.loads(data)))
+        name = get_name(func)
+        with self._lock:
+            if name in self._stats:
+                self._stats[name].add(stats)
+            else:
+                self._stats[name] = stats
+
+    def get_names(self) -> List[str]:
+        return sorted(self._stats)
+
+    def get_stats(self, name: str) -> pstats.Stats:
+        return self._stats[name]
+
+    def save(self, directory: str) -> List[str]:
+        os.makedirs(directory, exist_ok=True)
+        filenames = []
+        with self._lock:
+            for name, stats in self._stats.items():
+                filenames.append(os.path.join(directory, f'{name}.pstats'))
+                stats.dump_stats(filenames[-1])
+        return filenames
+
+
+class LoadedProfile:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def profile_step(func: Callable, *args, **kwargs):
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        return func(*args, **kwargs), None
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        profile.disable()
+    profile.create_stats()
+    return result, marshal.dumps(profile.stats)
+
+
+def get_name(func: Callable) -> str:
+    return f'{func.__module__}.{func.__qualname__}'
@@ -1,9 +1,15 @@
+import asyncio
 import inspect
 
 
+SCALAR_TYPES = (str, bytes, int, float, complex, bool, type(None), range)
+
+
 async def resolve(value):
     while inspect.isawaitable(value):
         value = await resolve_future(value)
+    if not has_futures(value):
+        return value
     if isinstance(value, dict):
         value = await resolve_dict(value)
     elif isinstance(value, list):
@@ -15,8 +21,28 @@ async def resolve(value):
     return value
 
 
+def has_futures(value) -> bool:
+    if isinstance(value, SCALAR_TYPES):
+        return False
+    elif inspect.isawaitable(value):
+        return True
+    elif isinstance(value, dict):
+        return any(has_futures(item) for item in value.values())
+    elif isinstance(value, (list, set, tuple)):
+        return any(has_futures(item) for item in value)
+    return False
+
+
+async def resolve_items(items):
+    items = list(items)
+    pending = [i for i, item in enumerate(items) if has_futures(item)]
+    for i, item in zip(pending, await asyncio.gather(*(resolve(items[i]) for i in pending))):
+        items[i] = item
+    return items
+
+
 async def resolve_dict(value):
-    return {key: await resolve(value) for key, value in value.items()}
+    return dict(zip(value.keys(), await resolve_items(value.values())))
 
 
 async def resolve_future(value):
@@ -24,12 +50,12 @@ async def resolve_future(value):
 
 
 async def resolve_list(value):
-    return [await resolve(item) for item in value]
+    return await resolve_items(value)
 
 
 async def resolve_set(value):
-    return set([await resolve(item) for item in value])
+    return set(await resolve_items(value))
 
 
 async def resolve_tuple(value):
-    return tuple([await resolve(item) for item in value])
+    return tuple(await resolve_items(value))
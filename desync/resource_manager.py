@@ -1,41 +1,127 @@
+import asyncio
+import bisect
+import itertools
 import threading
-import contextlib
+
+from typing import Dict, Optional
 
 
 class ResourceManager:
+    backfill = True
+    max_bypasses = 64
+
     def __init__(self, **kwargs: int):
         self.max_resources = kwargs
         self.available_resources = kwargs.copy()
-        self.update = threading.Event()
-
-    @contextlib.contextmanager
-    def request(self, **kwargs):
-        granted = self._process_request(kwargs)
-        while any(value is None for value in granted.values()):
-            self.update.clear()
-            self.update.wait()
+        self._condition = threading.Condition()
+        self._holders = threading.local()
+        self._waiters = []
+        self._counter = itertools.count()
+
+    def request(self, priority: int = 0, **kwargs: int) -> 'Request':
+        return Request(self, priority, kwargs)
+
+    def acquire_sync(self, **kwargs: int) -> Dict[str, int]:
+        self._check_request(kwargs)
+        with self._condition:
             granted = self._process_request(kwargs)
+            while any(value is None for value in granted.values()):
+                self._check_held(kwargs)
+                self._condition.wait()
+                granted = self._process_request(kwargs)
+            self._take(granted)
+            held = self._get_held()
+            for resource, value in granted.items():
+                held[resource] = held.get(resource, 0) + value
+        return granted
+
+    def release_sync(self, granted: Dict[str, int]):
+        held = self._get_held()
         for resource, value in granted.items():
-            self.available_resources[resource] -= value
-        yield granted
+            held[resource] -= value
+        self.release(granted)
+
+    async def acquire(self, priority: int = 0, **kwargs: int) -> Dict[str, int]:
+        self._check_request(kwargs)
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            self._process_request(kwargs)
+            future = loop.create_future()
+            bisect.insort(self._waiters, [(-priority, next(self._counter)), kwargs, future, loop, 0])
+            self._grant_waiters()
+        return await future
+
+    def release(self, granted: Dict[str, int]):
+        with self._condition:
+            for resource, value in granted.items():
+                self.available_resources[resource] += value
+            self._grant_waiters()
+            self._condition.notify_all()
+
+    def _grant_waiters(self):
+        head = None
+        waiters = []
+        for waiter in self._waiters:
+            _, request, future, loop, _ = waiter
+            if future.cancelled():
+                continue
+            if head is None or (self.backfill and head[4] < self.max_bypasses):
+                granted = self._process_request(request)
+                if all(value is not None for value in granted.values()):
+                    self._take(granted)
+                    loop.call_soon_threadsafe(self._set_granted, future, granted)
+                    if head is not None:
+                        head[4] += 1
+                    continue
+            if head is None:
+                head = waiter
+            waiters.append(waiter)
+        self._waiters = waiters
+
+    def _set_granted(self, future: asyncio.Future, granted: Dict[str, int]):
+        if future.cancelled():
+            self.release(granted)
+        else:
+            future.set_result(granted)
+
+    def _take(self, granted: Dict[str, Optional[int]]):
         for resource, value in granted.items():
-            self.available_resources[resource] += value
-        self.update.set()
+            self.available_resources[resource] -= value
+
+    def _get_held(self) -> Dict[str, int]:
+        if not hasattr(self._holders, 'held'):
+            self._holders.held = {}
+        return self._holders.held
+
+    def _check_held(self, request):
+        held = self._get_held()
+        for key, value in request.items():
+            parts = [key] if key in self.max_resources else key.split('_', 1)
+            needed = 1 if parts[0] == 'max' else value
+            if needed > self.max_resources[parts[-1]] - held.get(parts[-1], 0):
+                raise ValueError(f'requesting {request}, but the current thread already holds '
+                                 f'{held.get(parts[-1], 0)} of {self.max_resources[parts[-1]]} {parts[-1]}')
+
+    def _check_request(self, request):
+        for key in request:
+            parts = key.split('_', 1)
+            if key not in self.max_resources and (parts[0] not in ('min', 'max') or parts[-1] not in self.max_resources):
+                raise ValueError(f'unknown resource {key}, expected one of {", ".join(self.max_resources)}')
 
     def _process_request(self, request):
         granted = {}
         for key, value in request.items():
-            parts = key.split('_', 1)
+            parts = [key] if key in self.max_resources else key.split('_', 1)
             if len(parts) == 1:
                 if value > self.max_resources[key]:
-                    raise ValueError(f'requesting {value} {key}, but a maximum of {self.available_resources[key]} are available')
+                    raise ValueError(f'requesting {value} {key}, but a maximum of {self.max_resources[key]} are available')
                 elif value <= self.available_resources[key]:
                     granted[key] = value
                 else:
                     granted[key] = None
             elif parts[0] == 'min':
                 if value > self.max_resources[parts[1]]:
-                    raise ValueError(f'requesting a minimum of {value} {key}, but a maximum of {self.available_resources[key]} are available')
+                    raise ValueError(f'requesting a minimum of {value} {parts[1]}, but a maximum of {self.max_resources[parts[1]]} are available')
                 elif value <= self.available_resources[parts[1]]:
                     granted[parts[1]] = max(value, self.available_resources[parts[1]])
                 else:
@@ -45,3 +131,25 @@ class ResourceManager:
             else:
                 granted[parts[1]] = None
         return granted
+
+
+class Request:
+    def __init__(self, resource_manager: ResourceManager, priority: int, request: Dict[str, int]):
+        self._resource_manager = resource_manager
+        self._priority = priority
+        self._request = request
+        self._granted = None
+
+    def __enter__(self) -> Dict[str, int]:
+        self._granted = self._resource_manager.acquire_sync(**self._request)
+        return self._granted
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._resource_manager.release_sync(self._granted)
+
+    async def __aenter__(self) -> Dict[str, int]:
+        self._granted = await self._resource_manager.acquire(self._priority, **self._request)
+        return self._granted
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._resource_manager.release(self._granted)
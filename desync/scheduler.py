@@ -0,0 +1,217 @@
+import asyncio
+import functools
+import heapq
+import inspect
+import itertools
+import os
+import threading
+import time
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from desync.executors import process_pool
+from desync.metrics import Registry, StepMetrics
+from desync.profiler import Profiler, profile_step
+from desync.resource_manager import ResourceManager
+from desync.steps import get_name, get_option
+from desync.tracer import Tracer, run_step
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+IO_WORKERS = 64
+
+SHARED_EXECUTORS: Dict[str, Executor] = {}
+SHARED_EXECUTORS_LOCK = threading.Lock()
+
+
+class Scheduler:
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        executors: Optional[Dict[str, Executor]] = None,
+        resource_manager: Optional[ResourceManager] = None,
+        window: Optional[int] = None,
+        tracer: Optional[Tracer] = None,
+        metrics: Optional[Registry] = None,
+        profiler: Optional[Profiler] = None,
+    ):
+        self._executor = executor
+        self._executors = {} if executors is None else dict(executors)
+        self._resource_manager = resource_manager
+        self.window = window
+        self.tracer = tracer
+        self.profiler = profiler
+        self.metrics = None if metrics is None else StepMetrics(metrics)
+        self._lanes: Dict[Optional[Executor], Lane] = {}
+        self._batchers: Dict[Callable, Batcher] = {}
+        self.durations: Dict[str, float] = {}
+        if self.metrics is not None:
+            self.metrics.watch_scheduler(self)
+
+    async def run(self, func: Callable, args: Sequence, kwargs: Dict[str, Any], priority: float = 0):
+        batch = get_option(func, 'batch')
+        if batch is not None:
+            if len(args) != 1 or len(kwargs) != 0:
+                raise ValueError(f'batchable step {get_name(func)} must be called with exactly one positional argument')
+            return await self.get_batcher(func, *batch).submit(args[0], priority)
+        return await self.execute(func, args, kwargs, priority)
+
+    async def execute(self, func: Callable, args: Sequence, kwargs: Dict[str, Any], priority: float = 0):
+        resources = get_option(func, 'resources')
+        if resources is None or self._resource_manager is None:
+            return await self.dispatch(func, args, kwargs, priority)
+        start = time.perf_counter()
+        async with self._resource_manager.request(priority, **resources):
+            if self.tracer is not None:
+                self.tracer.add_span(get_name(func), 'resources', start, time.perf_counter(), **resources)
+            return await self.dispatch(func, args, kwargs, priority)
+
+    async def dispatch(self, func: Callable, args: Sequence, kwargs: Dict[str, Any], priority: float = 0):
+        start = time.perf_counter()
+        if inspect.iscoroutinefunction(func):
+            result = await func(*args, **kwargs)
+        elif get_option(func, 'kind') == 'inline':
+            result = func(*args, **kwargs)
+        else:
+            executor = self.get_executor(get_option(func, 'kind'))
+            lane = self.get_lane(executor)
+            await lane.acquire(priority)
+            try:
+                queued = start
+                start = time.perf_counter()
+                loop = asyncio.get_running_loop()
+                call = functools.partial(func, *args, **kwargs)
+                profile = self.profiler is not None and self.profiler.sample(func)
+                if profile:
+                    call = functools.partial(profile_step, call)
+                if self.tracer is not None:
+                    call = functools.partial(run_step, call, (), {})
+                result = await loop.run_in_executor(executor, call)
+                if self.tracer is not None:
+                    result, run_start, run_end, pid, tid = result
+                    self.tracer.add_span(get_name(func), 'queue', queued, run_start)
+                    self.tracer.add_span(get_name(func), 'run', run_start, run_end, pid, tid)
+                if profile:
+                    result, stats = result
+                    self.profiler.add(func, stats)
+            finally:
+                lane.release()
+        self.record_duration(func, time.perf_counter() - start)
+        return result
+
+    def get_executor(self, kind: Optional[str] = None) -> Optional[Executor]:
+        if kind is None:
+            return self._executor
+        if kind not in self._executors:
+            self._executors[kind] = get_shared_executor(kind)
+        return self._executors[kind]
+
+    def get_batcher(self, func: Callable, max_batch: int, max_wait_ms: float) -> 'Batcher':
+        if func not in self._batchers:
+            self._batchers[func] = Batcher(self, func, max_batch, max_wait_ms)
+        return self._batchers[func]
+
+    def get_lane(self, executor: Optional[Executor]) -> 'Lane':
+        if executor not in self._lanes:
+            default_workers = min(32, (os.cpu_count() or 1) + 4)
+            self._lanes[executor] = Lane(getattr(executor, '_max_workers', default_workers))
+        return self._lanes[executor]
+
+    def get_queue_depth(self) -> int:
+        return sum(lane.get_depth() for lane in list(self._lanes.values()))
+
+    def get_resources(self) -> List[str]:
+        return [] if self._resource_manager is None else list(self._resource_manager.max_resources)
+
+    def get_utilisation(self, resource: str) -> float:
+        maximum = self._resource_manager.max_resources[resource]
+        return 1 - self._resource_manager.available_resources[resource] / maximum if maximum > 0 else 0.0
+
+    def record_duration(self, func: Callable, duration: float):
+        name = get_name(func)
+        previous = self.durations.get(name, duration)
+        self.durations[name] = (previous + duration) / 2
+
+
+def get_shared_executor(kind: str) -> Executor:
+    with SHARED_EXECUTORS_LOCK:
+        if kind not in SHARED_EXECUTORS:
+            SHARED_EXECUTORS[kind] = process_pool() if kind == 'cpu' else ThreadPoolExecutor(IO_WORKERS)
+        return SHARED_EXECUTORS[kind]
+
+
+class Lane:
+    def __init__(self, slots: int):
+        self._slots = slots
+        self._waiters = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority: float = 0):
+        if self._slots > 0 and len(self._waiters) == 0:
+            self._slots -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def get_depth(self) -> int:
+        return len(self._waiters)
+
+    def release(self):
+        while len(self._waiters) > 0:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.cancelled():
+                future.set_result(None)
+                return
+        self._slots += 1
+
+
+class Batcher:
+    def __init__(self, scheduler: Scheduler, func: Callable, max_batch: int, max_wait_ms: float):
+        self._scheduler = scheduler
+        self._func = func
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[Any, float, asyncio.Future]] = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item: Any, priority: float = 0):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, priority, future))
+        if len(self._pending) >= self._max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait, self.flush)
+        return await future
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if len(pending) > 0:
+            task = asyncio.ensure_future(self._run(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: List[Tuple[Any, float, asyncio.Future]]):
+        items = [item for item, _, _ in pending]
+        priority = max(priority for _, priority, _ in pending)
+        try:
+            results = await self._scheduler.execute(self._func, [items], {}, priority)
+            if len(results) != len(items):
+                raise ValueError(f'batchable step {get_name(self._func)} returned {len(results)} results for {len(items)} inputs')
+        except Exception as error:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, _, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,29 @@
+import sys
+
+
+ATOMIC_TYPES = (str, bytes, bytearray, int, float, complex, bool, type(None), range)
+
+
+def get_size(value) -> int:
+    size = 0
+    seen = set()
+    stack = [value]
+    while len(stack) > 0:
+        top = stack.pop()
+        if id(top) in seen:
+            continue
+        seen.add(id(top))
+        size += sys.getsizeof(top)
+        if isinstance(top, ATOMIC_TYPES) or isinstance(top, type):
+            continue
+        elif isinstance(top, dict):
+            stack.extend(top.keys())
+            stack.extend(top.values())
+        elif isinstance(top, (list, tuple, set, frozenset)):
+            stack.extend(top)
+        elif hasattr(top, '__dict__'):
+            stack.append(top.__dict__)
+        for slot in getattr(type(top), '__slots__', ()):
+            if hasattr(top, slot):
+                stack.append(getattr(top, slot))
+    return size
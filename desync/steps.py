@@ -0,0 +1,42 @@
+from typing import Any, Callable, Optional
+
+
+KINDS = ('cpu', 'io', 'inline')
+
+
+def step(*, kind: Optional[str] = None) -> Callable[[Callable], Callable]:
+    if kind is not None and kind not in KINDS:
+        raise ValueError(f'unknown step kind {kind}, expected one of {", ".join(KINDS)}')
+
+    def decorator(func: Callable) -> Callable:
+        return set_option(func, 'kind', kind)
+    return decorator
+
+
+def batchable(max_batch: int = 64, max_wait_ms: float = 5) -> Callable[[Callable], Callable]:
+    def decorator(func: Callable) -> Callable:
+        return set_option(func, 'batch', (max_batch, max_wait_ms))
+    return decorator
+
+
+def requires(**resources: int) -> Callable[[Callable], Callable]:
+    def decorator(func: Callable) -> Callable:
+        return set_option(func, 'resources', resources)
+    return decorator
+
+
+def immutable(func: Callable) -> Callable:
+    return set_option(func, 'immutable', True)
+
+
+def get_option(func: Callable, key: str, default: Any = None) -> Any:
+    return getattr(func, '__desync__', {}).get(key, default)
+
+
+def get_name(func: Callable) -> str:
+    return getattr(func, '__name__', type(func).__name__)
+
+
+def set_option(func: Callable, key: str, value: Any) -> Callable:
+    func.__dict__.setdefault('__desync__', {})[key] = value
+    return func
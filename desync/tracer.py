@@ -0,0 +1,41 @@
+import json
+import os
+import threading
+import time
+
+from typing import Callable, Dict, Sequence
+
+
+class Tracer:
+    def __init__(self):
+        self.events = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, category: str, start: float, end: float, pid: int = None, tid: int = None, **args):
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (start - self._origin) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': os.getpid() if pid is None else pid,
+            'tid': threading.get_ident() if tid is None else tid,
+            'args': args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def dump(self, fileobj):
+        with self._lock:
+            json.dump({'traceEvents': list(self.events), 'displayTimeUnit': 'ms'}, fileobj)
+
+    def save(self, filename: str):
+        with open(filename, 'w') as fileobj:
+            self.dump(fileobj)
+
+
+def run_step(func: Callable, args: Sequence, kwargs: Dict):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, start, time.perf_counter(), os.getpid(), threading.get_ident()
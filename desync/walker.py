@@ -1,23 +1,28 @@
 import ast
 import asyncio
-import copy
-import functools
 import inspect
+import pickle
+import time
 
 from operator import mod
 from desync.cache import Cache
 from desync.futuretools import ensure_future, is_future
 from desync.hashtools import hash_function, hash_input
 from desync.resolver import resolve
-from typing import Optional, Sequence, Union
+from desync.scheduler import Scheduler
+from desync.sizetools import get_size
+from desync.steps import get_name, get_option
+from typing import Optional, Sequence, Set, Tuple, Union
 
 
 class Walker:
-    def __init__(self, scopes, old_cache, new_cache):
+    def __init__(self, scopes, old_cache, new_cache, scheduler: Optional[Scheduler] = None, sinks: Tuple[Set[asyncio.Task], ...] = ()):
         self._scopes = scopes
-        self._tasks = []
+        self._tasks = set()
+        self._sinks = sinks
         self._old_cache = old_cache
         self._new_cache = new_cache
+        self._scheduler = Scheduler() if scheduler is None else scheduler
 
     def eval_node(self, node):
         if isinstance(node, ast.Assign):
@@ -73,29 +78,23 @@ class Walker:
             self.assign(node.targets[0], ensure_future(value))
 
     def eval_attribute(self, node: ast.Attribute):
-        task = asyncio.create_task(eval_attribute(self.eval_node(node.value), node.attr))
-        self._tasks.append(task)
-        return task
+        return self.create_task(eval_attribute(self.eval_node(node.value), node.attr))
 
     def eval_await(self, node: ast.Await):
-        task = asyncio.create_task(eval_call(ensure_future(self.eval_node(node.value))))
-        self._tasks.append(task)
-        return task
+        return self.create_task(eval_call(ensure_future(self.eval_node(node.value))))
 
     def eval_binop(self, node: ast.BinOp):
         left = self.eval_node(node.left)
         right = self.eval_node(node.right)
         op = mod if isinstance(node.op, ast.Mod) else None
-        task = asyncio.create_task(eval_call(
+        return self.create_task(eval_call(
             ensure_future(op),
             [left, right],
             ast_args=[type(left), type(right)],
         ))
-        self._tasks.append(task)
-        return task
 
     def eval_call(self, node: ast.Call):
-        task = asyncio.create_task(eval_call(
+        return self.create_task(eval_call(
             ensure_future(self.eval_node(node.func)),
             [self.eval_node(arg) for arg in node.args],
             [self.eval_node(keyword.value) for keyword in node.keywords],
@@ -103,9 +102,9 @@ class Walker:
             ast_kwargs=node.keywords,
             old_cache=self._old_cache,
             new_cache=self._new_cache,
+            scheduler=self._scheduler,
+            priority=getattr(node, 'priority', 0),
         ))
-        self._tasks.append(task)
-        return task
 
     def eval_constant(self, node: ast.Constant):
         loop = asyncio.get_running_loop()
@@ -118,18 +117,14 @@ class Walker:
             raise NotImplementedError
         generator = node.generators[0]
         items = self.eval_node(generator.iter)
-        task = asyncio.create_task(eval_dictcomp(items, generator.target, node.key, node.value, self.copy_scopes(), self._old_cache, self._new_cache))
-        self._tasks.append(task)
-        return task
+        return self.create_task(eval_dictcomp(items, generator.target, node.key, node.value, self.copy_scopes(), self._old_cache, self._new_cache, self._scheduler, self._sinks))
 
     def eval_expr(self, node: ast.Expr):
         return self.eval_node(node.value)
 
     def eval_for(self, node: ast.For):
         iter = self.eval_node(node.iter)
-        task = asyncio.create_task(eval_for(iter, node.target, node.body, self.copy_scopes(), self._old_cache, self._new_cache))
-        self._tasks.append(task)
-        return task
+        return self.create_task(eval_for(iter, node.target, node.body, self.copy_scopes(), self._old_cache, self._new_cache, self._scheduler, self._sinks))
 
     def eval_functiondef(self, node: ast.FunctionDef):
         res = None
@@ -141,17 +136,13 @@ class Walker:
         test = self.eval_node(node.test)
         body = node.body
         orelse = node.orelse
-        task = asyncio.create_task(eval_if(test, body, orelse, self.copy_scopes(), self._old_cache, self._new_cache))
-        self._tasks.append(task)
-        return task
+        return self.create_task(eval_if(test, body, orelse, self.copy_scopes(), self._old_cache, self._new_cache, self._scheduler, self._sinks))
 
     def eval_ifexp(self, node: ast.IfExp):
         test = self.eval_node(node.test)
         body = node.body
         orelse = node.orelse
-        task = asyncio.create_task(eval_ifexp(test, body, orelse, self.copy_scopes(), self._old_cache, self._new_cache))
-        self._tasks.append(task)
-        return task
+        return self.create_task(eval_ifexp(test, body, orelse, self.copy_scopes(), self._old_cache, self._new_cache, self._scheduler, self._sinks))
 
     def eval_list(self, node: ast.List):
         return [self.eval_node(elt) for elt in node.elts]
@@ -161,9 +152,7 @@ class Walker:
             raise NotImplementedError
         generator = node.generators[0]
         items = self.eval_node(generator.iter)
-        task = asyncio.create_task(eval_listcomp(items, generator.target, node.elt, self.copy_scopes(), self._old_cache, self._new_cache))
-        self._tasks.append(task)
-        return task
+        return self.create_task(eval_listcomp(items, generator.target, node.elt, self.copy_scopes(), self._old_cache, self._new_cache, self._scheduler, self._sinks))
 
     def eval_name(self, node: ast.Name):
         for scope in self._scopes[::-1]:
@@ -196,7 +185,7 @@ class Walker:
             if is_future(value):
                 loop = asyncio.get_running_loop()
                 futures = [loop.create_future() for _ in target.elts]
-                self._tasks.append(asyncio.create_task(eval_assign(futures, value)))
+                self.create_task(eval_assign(futures, value))
             else:
                 futures = [ensure_future(subvalue) for subvalue in value]
 
@@ -212,6 +201,18 @@ class Walker:
     def set_value(self, key, value):
         self._scopes[-1][key] = value
 
+    def create_task(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        for sink in self._sinks:
+            sink.add(task)
+        task.add_done_callback(self.release_task)
+        return task
+
+    def release_task(self, task: asyncio.Task):
+        if task.cancelled() or task.exception() is None:
+            self._tasks.discard(task)
+
     async def join(self):
         await asyncio.gather(*self._tasks)
 
@@ -235,78 +236,133 @@ async def eval_call(
     ast_args=None,
     ast_kwargs=None,
     old_cache: Optional[Cache] = None,
-    new_cache: Optional[Cache] = None
+    new_cache: Optional[Cache] = None,
+    scheduler: Optional[Scheduler] = None,
+    priority: float = 0,
 ):
     pre_args = [] if pre_args is None else pre_args
     pre_kwargs = [] if pre_kwargs is None else pre_kwargs
     ast_args = [type(arg) for arg in pre_args] if ast_args is None else ast_args
     ast_kwargs = [type(kwarg) for kwarg in pre_kwargs] if ast_kwargs is None else ast_kwargs
-
-    args = []
-    for ast_arg, pre_arg in zip(ast_args, await resolve(pre_args)):
-        if isinstance(ast_arg, ast.Starred):
-            args.extend(pre_arg)
-        else:
-            args.append(pre_arg)
-    kwargs = {}
-    for ast_kwarg, pre_kwarg in zip(ast_kwargs, pre_kwargs):
-        value = await resolve(pre_kwarg)
-        if ast_kwarg.arg is None:
-            kwargs.update(value)
-        else:
-            kwargs[ast_kwarg.arg] = value
-    loop = asyncio.get_running_loop()
-    func = await func_future
-    if inspect.isbuiltin(func) or type(func).__name__ == 'Desync' or func.__name__ in __builtins__:
+    tracer = None if scheduler is None else scheduler.tracer
+    resolve_start = time.perf_counter()
+
+    metrics = None if scheduler is None else scheduler.metrics
+    if metrics is not None:
+        metrics.pending.inc()
+    try:
+        args = []
+        for ast_arg, pre_arg in zip(ast_args, await resolve(pre_args)):
+            if isinstance(ast_arg, ast.Starred):
+                args.extend(pre_arg)
+            else:
+                args.append(pre_arg)
+        kwargs = {}
+        for ast_kwarg, pre_kwarg in zip(ast_kwargs, pre_kwargs):
+            value = await resolve(pre_kwarg)
+            if ast_kwarg.arg is None:
+                kwargs.update(value)
+            else:
+                kwargs[ast_kwarg.arg] = value
+        func = await func_future
+    finally:
+        if metrics is not None:
+            metrics.pending.dec()
+    if type(func).__name__ == 'Desync':
+        result = await func.run_nested_workflow(args, kwargs, old_cache, new_cache, scheduler)
+    elif inspect.isbuiltin(func) or getattr(func, '__name__', None) in __builtins__:
         result = func(*args, **kwargs)
     else:
+        name = get_name(func)
         try:
             func_hash = hash_function(func)
             input_hash = hash_input(args, kwargs)
-            if old_cache and old_cache.has_outputs(func_hash, input_hash):
-                result = old_cache.get_outputs(func_hash, input_hash)
-            else:
-                if inspect.iscoroutinefunction(func):
-                    result = await func(*args, **kwargs)
-                else:
-                    partial_func = functools.partial(func, *args, **kwargs)
-                    result = await loop.run_in_executor(None, partial_func)
-            if new_cache:
-                new_cache.set_outputs(func_hash, input_hash, copy.deepcopy(result))
         except TypeError:
-            result = func(*args, **kwargs)
+            func_hash = input_hash = None
+        hit = False
+        if tracer is not None:
+            tracer.add_span(name, 'resolve', resolve_start, time.perf_counter())
+        start = time.perf_counter()
+        if func_hash is not None and old_cache and old_cache.has_outputs(func_hash, input_hash):
+            result = old_cache.get_outputs(func_hash, input_hash)
+            cost = old_cache.get_cost(func_hash, input_hash)
+            hit = True
+            if metrics is not None:
+                metrics.cache_hits.inc(step=name)
+        else:
+            if metrics is not None:
+                metrics.cache_misses.inc(step=name)
+                metrics.running.inc()
+            start = time.perf_counter()
+            try:
+                result = await (Scheduler() if scheduler is None else scheduler).run(func, args, kwargs, priority)
+            finally:
+                if metrics is not None:
+                    metrics.running.dec()
+            cost = time.perf_counter() - start
+            if metrics is not None:
+                metrics.latency.observe(cost, step=name)
+        if func_hash is not None and new_cache:
+            try:
+                new_cache.set_outputs(
+                    func_hash,
+                    input_hash,
+                    result,
+                    cost=cost,
+                    immutable=get_option(func, 'immutable', False),
+                )
+            except (pickle.PicklingError, TypeError, AttributeError):
+                pass
+        if tracer is not None:
+            tracer.add_span(
+                name,
+                'step',
+                start,
+                time.perf_counter(),
+                func_hash=None if func_hash is None else f'{func_hash:x}',
+                input_hash=None if input_hash is None else f'{input_hash:x}',
+                cache='hit' if hit else 'miss',
+                size=get_size(result),
+            )
+        if metrics is not None:
+            metrics.completed.inc(step=name)
     return result
 
 
-async def eval_dictcomp(items_future, target, key, value, scopes, old_cache, new_cache):
+async def eval_dictcomp(items_future, target, key, value, scopes, old_cache, new_cache, scheduler, sinks=()):
     items = await resolve(items_future)
-    walker = Walker(scopes, old_cache, new_cache)
+    walker = Walker(scopes, old_cache, new_cache, scheduler, sinks)
+    window = Window(scheduler.window)
     res = {}
     scopes.append({})
     for item in items:
         walker.assign(target, item)
         tmp = await resolve(walker.eval_node(key))
         res[tmp] = walker.eval_node(value)
+        await window.admit(res, tmp)
     scopes.pop()
     return res
 
 
-async def eval_for(iter_future, target, body, scopes, old_cache, new_cache):
+async def eval_for(iter_future, target, body, scopes, old_cache, new_cache, scheduler, sinks=()):
     iter = await resolve(iter_future)
-    walker = Walker(scopes, old_cache, new_cache)
+    window = Window(scheduler.window)
     scopes.append({})
     res = None
     for item in iter:
+        tasks = set()
+        walker = Walker(scopes, old_cache, new_cache, scheduler, sinks + (tasks,))
         walker.assign(target, item)
-        for statement in body:
-            res = walker.eval_node(statement)
+        statements = [walker.eval_node(statement) for statement in body]
+        res = statements[-1]
+        await window.admit_tasks(tasks)
     scopes.pop()
     return res
 
 
-async def eval_if(test_future, body, orelse, scopes, old_cache, new_cache):
+async def eval_if(test_future, body, orelse, scopes, old_cache, new_cache, scheduler, sinks=()):
     test = await test_future
-    walker = Walker(scopes, old_cache, new_cache)
+    walker = Walker(scopes, old_cache, new_cache, scheduler, sinks)
     scopes.append({})
     res = None
     if test:
@@ -319,19 +375,52 @@ async def eval_if(test_future, body, orelse, scopes, old_cache, new_cache):
     return res
 
 
-async def eval_ifexp(test_future, body, orelse, scopes, old_cache, new_cache):
+async def eval_ifexp(test_future, body, orelse, scopes, old_cache, new_cache, scheduler, sinks=()):
     test = await test_future
-    walker = Walker(scopes, old_cache, new_cache)
+    walker = Walker(scopes, old_cache, new_cache, scheduler, sinks)
     return walker.eval_node(body) if test else walker.eval_node(orelse)
 
 
-async def eval_listcomp(items_future, target, elt, scopes, old_cache, new_cache):
+async def eval_listcomp(items_future, target, elt, scopes, old_cache, new_cache, scheduler, sinks=()):
     items = await resolve(items_future)
-    walker = Walker(scopes, old_cache, new_cache)
+    walker = Walker(scopes, old_cache, new_cache, scheduler, sinks)
+    window = Window(scheduler.window)
     res = []
     scopes.append({})
     for item in items:
         walker.assign(target, item)
         res.append(walker.eval_node(elt))
+        await window.admit(res, len(res) - 1)
     scopes.pop()
     return res
+
+
+class Window:
+    def __init__(self, size: Optional[int] = None):
+        self._size = size
+        self._pending = {}
+
+    async def admit(self, container, key):
+        if self._size is None:
+            return
+        task = asyncio.ensure_future(resolve(container[key]))
+        container[key] = task
+        self._pending[task] = (container, key)
+        while len(self._pending) >= self._size:
+            done, _ = await asyncio.wait(self._pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                container, key = self._pending.pop(task)
+                if not task.cancelled() and task.exception() is None:
+                    container[key] = task.result()
+
+    async def admit_tasks(self, tasks: Set[asyncio.Task]):
+        if self._size is None:
+            return
+        await self.admit([join_tasks(tasks)], 0)
+
+
+async def join_tasks(tasks: Set[asyncio.Task]):
+    pending = [task for task in tasks if not task.done()]
+    while len(pending) > 0:
+        await asyncio.wait(pending)
+        pending = [task for task in tasks if not task.done()]
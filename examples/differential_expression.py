@@ -1,10 +1,13 @@
-from desync import desync
+from desync import desync, requires, ResourceManager
 
 
-def check_read_quality(read_file, settings):
-    with settings['resources'].request(max_cpus=4) as cpus:
-        print(f'checking read quality for {read_file}')
-        return read_file + '.txt'
+RESOURCES = ResourceManager(cpus=64, mem_gb=256)
+
+
+@requires(cpus=4, mem_gb=8)
+def check_read_quality(read_file):
+    print(f'checking read quality for {read_file}')
+    return read_file + '.txt'
 
 
 def trim_reads(read_file, mate_read_file):
@@ -32,7 +35,7 @@ def analyse_differential_expression(transcript_quantities_file, sample_descripti
     return transcript_quantities_file + '.txt'
 
 
-@desync
+@desync(resource_manager=RESOURCES)
 def align_reads_workflow(read_file, mate_read_file, genome_file):
     check_read_quality(read_file)
     check_read_quality(mate_read_file)
@@ -42,7 +45,7 @@ def align_reads_workflow(read_file, mate_read_file, genome_file):
     return align_reads(trimmed_read_file, trimmed_mate_read_file, genome_file)
 
 
-@desync
+@desync(resource_manager=RESOURCES)
 def differential_expression_workflow(
     read_files,
     mate_read_files,
@@ -57,7 +60,7 @@ def differential_expression_workflow(
 
 
 if __name__ == '__main__':
-    res = differential_exression_workflow(
+    res = differential_expression_workflow(
         ['A_01.fasta.gz', 'B_01.fasta.gz', 'C_01.fasta.gz', 'D_01.fasta.gz', 'E_01.fasta.gz'],
         ['A_02.fasta.gz', 'B_02.fasta.gz', 'C_02.fasta.gz', 'D_02.fasta.gz', 'E_02.fasta.gz'],
         'genome.fasta.gz',
@@ -9,4 +9,7 @@ setup(
     description='Desynchronise functions',
     packages=find_packages(),
     install_requires=[],
+    entry_points={
+        'console_scripts': ['desync-worker=desync.distributed:main'],
+    },
 )
@@ -0,0 +1,49 @@
+import unittest
+
+import desync
+
+
+BATCHES = []
+
+
+@desync.batchable(max_batch=4, max_wait_ms=10)
+def score(items):
+    BATCHES.append(len(items))
+    return [item * 2 for item in items]
+
+
+@desync.batchable(max_batch=4, max_wait_ms=10)
+def fail(items):
+    BATCHES.append(items)
+    raise TypeError('bad batch')
+
+
+@desync.desync
+def outer(items):
+    return [score(item) for item in items]
+
+
+@desync.desync
+def outer_fail(items):
+    return [fail(item) for item in items]
+
+
+class TestBatchable(unittest.TestCase):
+    def setUp(self):
+        BATCHES.clear()
+
+    def test_batchable(self):
+        self.assertEqual([item * 2 for item in range(10)], outer(range(10)))
+        self.assertEqual([4, 4, 2], BATCHES)
+
+    def test_cache(self):
+        outer(range(10))
+        outer.set_cache(outer.get_cache())
+        BATCHES.clear()
+        self.assertEqual([item * 2 for item in range(12)], outer(range(12)))
+        self.assertEqual([2], BATCHES)
+
+    def test_type_error(self):
+        with self.assertRaises(TypeError):
+            outer_fail(range(4))
+        self.assertEqual([[0, 1, 2, 3]], BATCHES)
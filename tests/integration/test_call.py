@@ -1,3 +1,5 @@
+import functools
+import threading
 import unittest
 import subprocess
 
@@ -16,6 +18,29 @@ def inner_kwargs(*, item):
     return item + 1
 
 
+def get_thread(offset, item):
+    return item + offset, threading.get_ident()
+
+
+async def add_async(offset, item):
+    return item + offset
+
+
+class Adder:
+    def __call__(self, item):
+        return item + 1, threading.get_ident()
+
+
+get_thread_partial = functools.partial(get_thread, 1)
+add_async_partial = functools.partial(add_async, 1)
+adder = Adder()
+
+
+@desync
+def outer_unhashable(item):
+    return get_thread_partial(item), add_async_partial(item), adder(item)
+
+
 @desync
 def outer(item1):
     inner_args(item1)
@@ -30,3 +55,11 @@ def outer(item1):
 class TestCall(unittest.TestCase):
     def test_call(self):
         self.assertEqual(1, outer(0))
+
+    def test_call_unhashable(self):
+        (value, thread), async_value, (adder_value, adder_thread) = outer_unhashable(0)
+        self.assertEqual(1, value)
+        self.assertNotEqual(threading.get_ident(), thread)
+        self.assertEqual(1, async_value)
+        self.assertEqual(1, adder_value)
+        self.assertNotEqual(threading.get_ident(), adder_thread)
@@ -0,0 +1,39 @@
+import os
+import tempfile
+import unittest
+
+from desync import desync
+
+
+CALLS = []
+FAIL = set()
+
+
+def inner(item):
+    CALLS.append(item)
+    if item in FAIL:
+        raise RuntimeError(f'failed on {item}')
+    return item * item
+
+
+def outer(items):
+    return [inner(item) for item in items]
+
+
+class TestCheckpoint(unittest.TestCase):
+    def test_resume(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'checkpoint')
+            CALLS.clear()
+            FAIL.add(3)
+            with self.assertRaises(RuntimeError):
+                desync(outer, checkpoint=filename)(range(5))
+            FAIL.clear()
+
+            CALLS.clear()
+            self.assertEqual([0, 1, 4, 9, 16], desync(outer, checkpoint=filename)(range(5)))
+            self.assertEqual([3], CALLS)
+
+            CALLS.clear()
+            self.assertEqual([0, 1, 4, 9, 16], desync(outer, checkpoint=filename)(range(5)))
+            self.assertEqual([], CALLS)
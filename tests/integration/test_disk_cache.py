@@ -0,0 +1,32 @@
+import tempfile
+import unittest
+
+from desync import desync
+from desync.disk_cache import DiskCache
+
+
+CALLS = []
+
+
+def inner(item):
+    CALLS.append(item)
+    return item + 1
+
+
+@desync
+def outer(items):
+    return [inner(item) for item in items]
+
+
+class TestDiskCache(unittest.TestCase):
+    def test_disk_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = DiskCache(directory)
+            outer.set_cache(cache)
+            outer.set_new_cache(cache)
+            self.assertEqual([1, 2, 3], outer(range(3)))
+            self.assertEqual(3, len(CALLS))
+
+            outer.set_cache(DiskCache(directory))
+            self.assertEqual([1, 2, 3, 4], outer(range(4)))
+            self.assertEqual([0, 1, 2, 3], sorted(CALLS))
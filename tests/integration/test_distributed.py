@@ -0,0 +1,55 @@
+import threading
+import time
+import unittest
+
+from desync import desync
+from desync.distributed import DistributedExecutor, Worker
+from multiprocessing import AuthenticationError
+
+
+def wrap(item):
+    return [item]
+
+
+def unwrap(items):
+    return items[0] * items[0]
+
+
+def slow(item):
+    time.sleep(0.2)
+    return item * item
+
+
+def distribute(items):
+    return [unwrap(wrap(item)) for item in items]
+
+
+def distribute_slow(items):
+    return [slow(item) for item in items]
+
+
+class TestDistributed(unittest.TestCase):
+    def setUp(self):
+        self.workers = [Worker(capacity=16, authkey=b'secret').start() for _ in range(2)]
+        self.executor = DistributedExecutor([worker.address for worker in self.workers], authkey=b'secret')
+
+    def tearDown(self):
+        self.executor.shutdown()
+        for worker in self.workers:
+            worker.shutdown()
+
+    def test_distributed(self):
+        outer = desync(distribute, executor=self.executor)
+        self.assertEqual([item * item for item in range(10)], outer(range(10)))
+        self.assertEqual(10, sum(worker.ref_hits for worker in self.workers))
+
+    def test_worker_failure(self):
+        outer = desync(distribute_slow, executor=self.executor)
+        threading.Timer(0.05, self.workers[0].shutdown).start()
+        self.assertEqual([item * item for item in range(8)], outer(range(8)))
+
+    def test_authkey(self):
+        with self.assertRaises(AuthenticationError):
+            DistributedExecutor([self.workers[0].address], authkey=b'wrong')
+        with self.assertRaises(ValueError):
+            DistributedExecutor([self.workers[0].address], authkey=b'')
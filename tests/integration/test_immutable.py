@@ -0,0 +1,29 @@
+import unittest
+
+from desync import desync, immutable
+from desync.cache import Cache
+from desync.hashtools import hash_function
+
+
+RESULTS = []
+
+
+@immutable
+def inner(item):
+    result = [item]
+    RESULTS.append(result)
+    return result
+
+
+@desync
+def outer(items):
+    return [inner(item) for item in items]
+
+
+class TestImmutable(unittest.TestCase):
+    def test_immutable(self):
+        outer.set_new_cache(Cache(storage='pickle'))
+        self.assertEqual([[0], [1], [2]], outer(range(3)))
+        stored = list(outer.get_cache()._outputs[hash_function(inner)].values())
+        self.assertEqual(3, len(stored))
+        self.assertTrue(all(any(output is result for result in RESULTS) for output in stored))
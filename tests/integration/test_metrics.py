@@ -0,0 +1,45 @@
+import unittest
+import urllib.request
+
+from desync import desync, ResourceManager
+from desync.metrics import Registry
+
+
+REGISTRY = Registry()
+RESOURCES = ResourceManager(cpus=4)
+
+
+def square(item):
+    return item * item
+
+
+@desync(metrics=REGISTRY, resource_manager=RESOURCES)
+def outer(items):
+    return [square(item) for item in items]
+
+
+class TestMetrics(unittest.TestCase):
+    def test_metrics(self):
+        self.assertEqual([0, 1, 4], outer(range(3)))
+        outer.set_cache(outer.get_cache())
+        self.assertEqual([0, 1, 4, 9], outer(range(4)))
+
+        self.assertEqual(7, REGISTRY.get_sample_value('desync_steps_completed_total', step='square'))
+        self.assertEqual(3, REGISTRY.get_sample_value('desync_cache_hits_total', step='square'))
+        self.assertEqual(4, REGISTRY.get_sample_value('desync_cache_misses_total', step='square'))
+        self.assertAlmostEqual(3 / 7, REGISTRY.get_sample_value('desync_cache_hit_ratio'))
+        self.assertEqual(4, REGISTRY.get_sample_value('desync_step_seconds_count', step='square'))
+        self.assertEqual(0, REGISTRY.get_sample_value('desync_steps_pending'))
+        self.assertEqual(0, REGISTRY.get_sample_value('desync_steps_running'))
+        self.assertEqual(0, REGISTRY.get_sample_value('desync_queue_depth'))
+        self.assertEqual(0, REGISTRY.get_sample_value('desync_resource_utilisation', resource='cpus'))
+        self.assertGreater(REGISTRY.get_sample_value('desync_cache_bytes', workflow='outer'), 0)
+
+        server = REGISTRY.serve(port=0)
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{server.server_address[1]}/metrics') as response:
+                text = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn('desync_steps_completed_total{step="square"} 7', text)
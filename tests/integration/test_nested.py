@@ -3,7 +3,11 @@ import unittest
 from desync import desync
 
 
+CALLS = []
+
+
 def inner(item):
+    CALLS.append(item)
     return item + 1
 
 
@@ -17,6 +21,19 @@ def outer2(item):
     return outer1(item)
 
 
+@desync
+def outer3(items):
+    return [outer1(item) for item in items]
+
+
 class TestNested(unittest.TestCase):
     def test_nested(self):
         self.assertEqual(1, outer2(0))
+
+    def test_nested_cache(self):
+        CALLS.clear()
+        self.assertEqual([1, 2, 3], outer3(range(3)))
+        self.assertEqual([0, 1, 2], sorted(CALLS))
+        outer3.set_cache(outer3.get_cache())
+        self.assertEqual([1, 2, 3, 4], outer3(range(4)))
+        self.assertEqual([0, 1, 2, 3], sorted(CALLS))
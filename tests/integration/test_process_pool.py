@@ -0,0 +1,24 @@
+import os
+import unittest
+
+from desync import desync
+from desync.executors import process_pool
+
+
+def inner(item):
+    return item * item, os.getpid()
+
+
+EXECUTOR = process_pool(2, preload=['json'])
+
+
+@desync(executor=EXECUTOR)
+def outer(items):
+    return [inner(item) for item in items]
+
+
+class TestProcessPool(unittest.TestCase):
+    def test_process_pool(self):
+        results = outer(range(10))
+        self.assertEqual([item * item for item in range(10)], [result for result, _ in results])
+        self.assertNotIn(os.getpid(), {pid for _, pid in results})
@@ -0,0 +1,39 @@
+import os
+import pstats
+import tempfile
+import unittest
+
+from desync import desync
+from desync.profiler import Profiler
+
+
+PROFILER = Profiler(every=2)
+
+
+def busy(item):
+    return sum(range(item))
+
+
+def square(item):
+    return busy(item) * busy(item)
+
+
+@desync(profiler=PROFILER)
+def outer(items):
+    return [square(item) for item in items]
+
+
+class TestProfiler(unittest.TestCase):
+    def test_profiler(self):
+        self.assertEqual([square(item) for item in range(4)], outer(range(4)))
+
+        name = f'{__name__}.square'
+        self.assertEqual([name], PROFILER.get_names())
+        calls = {function: stats[1] for (_, _, function), stats in PROFILER.get_stats(name).stats.items()}
+        self.assertEqual(2, calls['square'])
+        self.assertEqual(4, calls['busy'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            filenames = PROFILER.save(directory)
+            self.assertEqual([os.path.join(directory, f'{name}.pstats')], filenames)
+            self.assertEqual(PROFILER.get_stats(name).total_calls, pstats.Stats(filenames[0]).total_calls)
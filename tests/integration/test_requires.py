@@ -0,0 +1,31 @@
+import threading
+import time
+import unittest
+
+import desync
+
+
+LOCK = threading.Lock()
+USAGE = {'cpus': 0, 'max_cpus': 0}
+
+
+@desync.requires(cpus=2)
+def inner(item):
+    with LOCK:
+        USAGE['cpus'] += 2
+        USAGE['max_cpus'] = max(USAGE['max_cpus'], USAGE['cpus'])
+    time.sleep(0.01)
+    with LOCK:
+        USAGE['cpus'] -= 2
+    return item + 1
+
+
+@desync.desync(resource_manager=desync.ResourceManager(cpus=4))
+def outer(items):
+    return [inner(item) for item in items]
+
+
+class TestRequires(unittest.TestCase):
+    def test_requires(self):
+        self.assertEqual(list(range(1, 21)), outer(range(20)))
+        self.assertEqual(4, USAGE['max_cpus'])
@@ -0,0 +1,37 @@
+import os
+import threading
+import unittest
+
+import desync
+
+
+@desync.step(kind='inline')
+def inline_step(item):
+    return threading.get_ident()
+
+
+@desync.step(kind='io')
+def io_step(item):
+    return threading.get_ident()
+
+
+@desync.step(kind='cpu')
+def cpu_step(item):
+    return os.getpid()
+
+
+@desync.desync
+def outer(item):
+    return inline_step(item), io_step(item), cpu_step(item)
+
+
+class TestStepKinds(unittest.TestCase):
+    def test_step_kinds(self):
+        inline_thread, io_thread, cpu_pid = outer(0)
+        self.assertEqual(threading.get_ident(), inline_thread)
+        self.assertNotEqual(threading.get_ident(), io_thread)
+        self.assertNotEqual(os.getpid(), cpu_pid)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            desync.step(kind='gpu')
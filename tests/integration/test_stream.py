@@ -0,0 +1,42 @@
+import asyncio
+import time
+import unittest
+
+from desync import desync
+
+
+def inner(item):
+    time.sleep(0.02 * (5 - item))
+    return item + 1
+
+
+@desync
+def outer(items):
+    return [inner(item) for item in items]
+
+
+@desync
+def outer_dict(items):
+    return {item: inner(item) for item in items}
+
+
+class TestStream(unittest.TestCase):
+    def test_stream(self):
+        self.assertEqual([5, 4, 3, 2, 1], list(outer.stream(range(5))))
+
+    def test_stream_ordered(self):
+        self.assertEqual([1, 2, 3, 4, 5], list(outer.stream(range(5), ordered=True)))
+
+    def test_stream_dict(self):
+        self.assertEqual([(i, i + 1) for i in range(5)], list(outer_dict.stream(range(5), ordered=True)))
+
+    def test_stream_break(self):
+        for item in outer.stream(range(5)):
+            self.assertEqual(5, item)
+            break
+
+    def test_astream(self):
+        async def run():
+            return [item async for item in outer.astream(range(5), ordered=True)]
+
+        self.assertEqual([1, 2, 3, 4, 5], asyncio.run(run()))
@@ -0,0 +1,38 @@
+import io
+import json
+import threading
+import unittest
+
+from desync import desync
+from desync.tracer import Tracer
+
+
+TRACER = Tracer()
+
+
+def square(item):
+    return item * item
+
+
+@desync(tracer=TRACER)
+def outer(items):
+    return [square(item) for item in items]
+
+
+class TestTracer(unittest.TestCase):
+    def test_tracer(self):
+        self.assertEqual([0, 1, 4], outer(range(3)))
+        outer.set_cache(outer.get_cache())
+        self.assertEqual([0, 1, 4, 9], outer(range(4)))
+
+        fileobj = io.StringIO()
+        TRACER.dump(fileobj)
+        events = json.loads(fileobj.getvalue())['traceEvents']
+        steps = [event for event in events if event['cat'] == 'step']
+        self.assertEqual(['miss'] * 3, [event['args']['cache'] for event in steps[:3]])
+        self.assertEqual(['hit'] * 3 + ['miss'], sorted(event['args']['cache'] for event in steps[3:]))
+        self.assertTrue(all(event['name'] == 'square' and event['args']['size'] > 0 for event in steps))
+        runs = [event for event in events if event['cat'] == 'run']
+        self.assertEqual(4, len(runs))
+        self.assertNotIn(threading.get_ident(), {event['tid'] for event in runs})
+        self.assertEqual(4, len([event for event in events if event['cat'] == 'queue']))
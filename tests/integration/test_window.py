@@ -0,0 +1,93 @@
+import threading
+import time
+import unittest
+
+from desync import desync
+
+
+LOCK = threading.Lock()
+RUNNING = {'current': 0, 'max': 0}
+
+
+def inner(item):
+    with LOCK:
+        RUNNING['current'] += 1
+        RUNNING['max'] = max(RUNNING['max'], RUNNING['current'])
+    time.sleep(0.001)
+    with LOCK:
+        RUNNING['current'] -= 1
+    return item + 1
+
+
+def generate(n):
+    for item in range(n):
+        yield item
+
+
+@desync(window=3)
+def outer(n):
+    return [inner(item) for item in generate(n)]
+
+
+@desync(window=3)
+def outer_dict(n):
+    return {item: inner(item) for item in generate(n)}
+
+
+@desync(window=3)
+def outer_for(n):
+    for item in generate(n):
+        inner(item)
+
+
+@desync(window=3)
+def outer_for_assign(n):
+    for item in generate(n):
+        value = inner(item)
+
+
+def is_even(item):
+    return item % 2 == 0
+
+
+@desync(window=3)
+def outer_for_if(n):
+    for item in generate(n):
+        if is_even(item):
+            value = inner(item)
+
+
+@desync(window=3)
+def outer_for_nested(n):
+    for item in generate(n):
+        for other in generate(2):
+            value = inner(item)
+
+
+class TestWindow(unittest.TestCase):
+    def setUp(self):
+        RUNNING['max'] = 0
+
+    def test_listcomp(self):
+        self.assertEqual(list(range(1, 101)), outer(100))
+        self.assertLessEqual(RUNNING['max'], 3)
+
+    def test_dictcomp(self):
+        self.assertEqual({item: item + 1 for item in range(100)}, outer_dict(100))
+        self.assertLessEqual(RUNNING['max'], 3)
+
+    def test_for(self):
+        outer_for(100)
+        self.assertLessEqual(RUNNING['max'], 3)
+
+    def test_for_assign(self):
+        outer_for_assign(100)
+        self.assertLessEqual(RUNNING['max'], 3)
+
+    def test_for_if(self):
+        outer_for_if(100)
+        self.assertLessEqual(RUNNING['max'], 3)
+
+    def test_for_nested(self):
+        outer_for_nested(50)
+        self.assertLessEqual(RUNNING['max'], 6)
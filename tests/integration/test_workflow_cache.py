@@ -0,0 +1,99 @@
+import threading
+import unittest
+
+from desync import desync
+from desync.cache import Cache
+from desync.hashtools import FINGERPRINTS, hash_input
+
+
+CALLS = []
+SCALE = 2
+
+
+def inner(item):
+    CALLS.append(item)
+    return item + 1
+
+
+@desync
+def sample(item):
+    return inner(inner(item))
+
+
+@desync
+def study(items):
+    return [sample(item) for item in items]
+
+
+def multiply(item, scale):
+    return item * scale
+
+
+def scaled(items):
+    return [multiply(item, SCALE) for item in items]
+
+
+def make_lock():
+    return threading.Lock()
+
+
+def locked():
+    return make_lock()
+
+
+def lazy(items):
+    return [inner(item) for item in items]
+
+
+class TestWorkflowCache(unittest.TestCase):
+    def test_nested_workflow(self):
+        cache = Cache()
+        cache.set_outputs(sample.get_hash(), hash_input([0], {}), 'cached')
+        study.set_cache(cache)
+        CALLS.clear()
+        self.assertEqual(['cached', 3], study([0, 1]))
+        self.assertEqual([1, 2], sorted(CALLS))
+        self.assertEqual('cached', study.get_cache().get_outputs(sample.get_hash(), hash_input([0], {})))
+
+    def test_outer_workflow(self):
+        study.set_cache(Cache())
+        self.assertEqual([2, 3], study([0, 1]))
+        study.set_cache(study.get_cache())
+        study.set_new_cache(Cache())
+        CALLS.clear()
+        self.assertEqual([2, 3], study([0, 1]))
+        self.assertEqual([], CALLS)
+        self.assertEqual([2, 3], study.get_cache().get_outputs(study.get_hash(), hash_input([[0, 1]], {})))
+
+    def test_hash(self):
+        self.assertNotEqual(sample.get_hash(), study.get_hash())
+        self.assertIn(sample.get_version().major_hash, study.get_version().minor_hash)
+
+    def test_uncopyable_result(self):
+        self.assertIsInstance(desync(locked)(), type(threading.Lock()))
+
+    def test_result_by_reference(self):
+        workflow = desync(lazy)
+        result = workflow([0])
+        self.assertIs(result, workflow.get_cache().get_outputs(workflow.get_hash(), hash_input([[0]], {})))
+
+    def test_hash_constants(self):
+        global SCALE
+        before = desync(scaled).get_hash()
+        try:
+            SCALE = 3
+            FINGERPRINTS.clear()
+            self.assertNotEqual(before, desync(scaled).get_hash())
+        finally:
+            SCALE = 2
+            FINGERPRINTS.clear()
+
+
+class TestLazyVersion(unittest.TestCase):
+    def test_lazy(self):
+        workflow = desync(lazy)
+        self.assertIsNone(workflow._tree)
+        self.assertIsNone(workflow._version)
+        self.assertEqual([1], workflow([0]))
+        self.assertIsNotNone(workflow._tree)
+        self.assertIsNotNone(workflow._version)
@@ -0,0 +1,52 @@
+from desync.bounded_cache import BoundedCache
+from desync.cache import Cache
+from desync.sizetools import get_size
+from unittest import TestCase
+
+
+class TestBoundedCache(TestCase):
+    def test_outputs(self):
+        cache = BoundedCache(1 << 20, {
+            0: {0: 0},
+        })
+
+        self.assertTrue(cache.has_outputs(0, 0))
+        self.assertFalse(cache.has_outputs(0, 1))
+        self.assertEqual(0, cache.get_outputs(0, 0))
+        self.assertEqual(get_size(0), cache.nbytes)
+
+    def test_evict_cheap_and_large_first(self):
+        small = list(range(10))
+        large = list(range(1000))
+        cache = BoundedCache(2 * get_size(large) + get_size(small), storage='reference')
+
+        cache.set_outputs(0, 0, large, cost=1.0)
+        cache.set_outputs(0, 1, small, cost=1.0)
+        cache.set_outputs(0, 2, large, cost=10.0)
+        self.assertTrue(all(cache.has_outputs(0, i) for i in range(3)))
+
+        cache.set_outputs(0, 3, small, cost=1.0)
+        self.assertFalse(cache.has_outputs(0, 0))
+        self.assertTrue(cache.has_outputs(0, 1))
+        self.assertTrue(cache.has_outputs(0, 2))
+        self.assertTrue(cache.has_outputs(0, 3))
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+
+    def test_keep_cost_of_hits(self):
+        small = list(range(10))
+        large = list(range(1000))
+        old_cache = Cache(storage='reference')
+        old_cache.set_outputs(0, 0, large, cost=10.0)
+        cache = BoundedCache(get_size(large) + get_size(small), storage='reference')
+
+        cache.set_outputs(0, 0, old_cache.get_outputs(0, 0), cost=old_cache.get_cost(0, 0))
+        cache.set_outputs(0, 1, small, cost=0.001)
+        cache.set_outputs(0, 2, small, cost=0.001)
+        self.assertTrue(cache.has_outputs(0, 0))
+        self.assertEqual(10.0, cache.get_cost(0, 0))
+
+    def test_too_large(self):
+        cache = BoundedCache(1)
+        cache.set_outputs(0, 0, list(range(10)))
+        self.assertFalse(cache.has_outputs(0, 0))
+        self.assertEqual(0, cache.nbytes)
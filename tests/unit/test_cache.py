@@ -1,4 +1,5 @@
 from desync.cache import Cache
+from desync.sizetools import get_size
 from unittest import TestCase
 
 
@@ -16,3 +17,41 @@ class TestCache(TestCase):
         cache.set_outputs(0, 1, 0)
         self.assertTrue(cache.has_outputs(0, 1))
         self.assertEqual(0, cache.get_outputs(0, 1))
+
+    def test_storage(self):
+        outputs = [[0], [1]]
+        for storage in Cache.STORAGES:
+            cache = Cache(storage=storage)
+            cache.set_outputs(0, 0, outputs)
+            self.assertEqual([[0], [1]], cache.get_outputs(0, 0))
+            self.assertEqual(storage == 'reference', cache.get_outputs(0, 0) is outputs)
+
+        cache = Cache(storage='pickle')
+        cache.set_outputs(0, 0, outputs)
+        cache.get_outputs(0, 0)[0].append(1)
+        self.assertEqual([[0], [1]], cache.get_outputs(0, 0))
+
+        cache.set_outputs(0, 1, outputs, immutable=True)
+        self.assertIs(outputs, cache.get_outputs(0, 1))
+
+        with self.assertRaises(ValueError):
+            Cache(storage='unknown')
+
+    def test_nbytes(self):
+        cache = Cache({0: {0: (0,)}}, storage='reference')
+        cache.set_outputs(0, 2, (2,))
+        self.assertIsNone(cache.nbytes)
+        self.assertEqual(2 * get_size((0,)), cache.get_nbytes())
+
+        cache = Cache({0: {0: (0,)}}, storage='reference')
+        self.assertEqual(get_size((0,)), cache.get_nbytes())
+
+        cache.set_outputs(0, 1, tuple(range(10)))
+        self.assertEqual(get_size((0,)) + get_size(tuple(range(10))), cache.get_nbytes())
+
+        cache.set_outputs(0, 1, (1,))
+        self.assertEqual(2 * get_size((0,)), cache.get_nbytes())
+
+        loaded = Cache.__new__(Cache)
+        loaded.__dict__.update({key: value for key, value in cache.__dict__.items() if key != 'nbytes'})
+        self.assertEqual(2 * get_size((0,)), loaded.get_nbytes())
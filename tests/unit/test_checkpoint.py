@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+
+from desync.checkpoint import Checkpoint
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'checkpoint')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_outputs(self):
+        checkpoint = Checkpoint(self.filename)
+        checkpoint.set_outputs(0, 1, [1, 2])
+        self.assertTrue(checkpoint.has_outputs(0, 1))
+        self.assertFalse(checkpoint.has_outputs(0, 2))
+        self.assertEqual([1, 2], checkpoint.get_outputs(0, 1))
+        checkpoint.close()
+
+    def test_reopen(self):
+        checkpoint = Checkpoint(self.filename)
+        checkpoint.set_outputs(0, 1, 'a')
+        checkpoint.set_outputs(0, 2, 'b')
+        checkpoint.close()
+        checkpoint = Checkpoint(self.filename)
+        self.assertEqual('a', checkpoint.get_outputs(0, 1))
+        self.assertEqual('b', checkpoint.get_outputs(0, 2))
+        checkpoint.close()
+
+    def test_cost(self):
+        checkpoint = Checkpoint(self.filename)
+        checkpoint.set_outputs(0, 1, 'a', cost=2.5)
+        checkpoint.set_outputs(0, 2, 'b')
+        checkpoint.close()
+        checkpoint = Checkpoint(self.filename)
+        self.assertEqual(2.5, checkpoint.get_cost(0, 1))
+        self.assertIsNone(checkpoint.get_cost(0, 2))
+        checkpoint.close()
+
+    def test_duplicate(self):
+        checkpoint = Checkpoint(self.filename)
+        checkpoint.set_outputs(0, 1, 'a')
+        size = checkpoint.get_nbytes()
+        checkpoint.set_outputs(0, 1, 'a')
+        self.assertEqual(size, checkpoint.get_nbytes())
+        checkpoint.close()
+
+    def test_torn_tail(self):
+        checkpoint = Checkpoint(self.filename)
+        checkpoint.set_outputs(0, 1, 'a')
+        checkpoint.set_outputs(0, 2, 'b')
+        checkpoint.close()
+        size = os.path.getsize(self.filename)
+        with open(self.filename, 'r+b') as fileobj:
+            fileobj.truncate(size - 1)
+
+        checkpoint = Checkpoint(self.filename)
+        self.assertEqual('a', checkpoint.get_outputs(0, 1))
+        self.assertFalse(checkpoint.has_outputs(0, 2))
+        checkpoint.set_outputs(0, 3, 'c')
+        checkpoint.close()
+        checkpoint = Checkpoint(self.filename)
+        self.assertEqual('c', checkpoint.get_outputs(0, 3))
+        checkpoint.close()
+
+    def test_corrupt_record(self):
+        checkpoint = Checkpoint(self.filename)
+        checkpoint.set_outputs(0, 1, 'a')
+        checkpoint.set_outputs(0, 2, 'b')
+        checkpoint.close()
+        with open(self.filename, 'r+b') as fileobj:
+            fileobj.seek(-1, os.SEEK_END)
+            fileobj.write(b'!')
+
+        checkpoint = Checkpoint(self.filename)
+        self.assertTrue(checkpoint.has_outputs(0, 1))
+        self.assertFalse(checkpoint.has_outputs(0, 2))
+        checkpoint.close()
+
+    def test_unpicklable(self):
+        checkpoint = Checkpoint(self.filename)
+        checkpoint.set_outputs(0, 1, lambda: None)
+        self.assertFalse(checkpoint.has_outputs(0, 1))
+        checkpoint.close()
+
+    def test_pending(self):
+        checkpoint = Checkpoint(self.filename)
+        for index in range(100):
+            checkpoint.set_outputs(0, index, [index], cost=index)
+        self.assertEqual([50], checkpoint.get_outputs(0, 50))
+        self.assertEqual(50, checkpoint.get_cost(0, 50))
+        size = checkpoint.get_nbytes()
+        checkpoint.sync()
+        self.assertEqual(size, os.path.getsize(self.filename))
+        self.assertEqual([99], checkpoint.get_outputs(0, 99))
+        checkpoint.close()
+
+    def test_write_error(self):
+        checkpoint = Checkpoint(self.filename)
+        checkpoint.set_outputs(0, 1, 'a')
+        checkpoint.sync()
+        checkpoint._fileobj.close()
+        checkpoint.set_outputs(0, 2, 'b')
+        with self.assertRaises(ValueError):
+            checkpoint.sync()
+        self.assertFalse(checkpoint.has_outputs(0, 2))
+        checkpoint.set_outputs(0, 3, 'c')
+        with self.assertRaises(ValueError):
+            checkpoint.sync()
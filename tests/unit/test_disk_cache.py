@@ -0,0 +1,79 @@
+import os
+import pickle
+import tempfile
+
+from desync.disk_cache import DiskCache
+from unittest import TestCase
+
+
+class TestDiskCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_outputs(self):
+        cache = DiskCache(self.directory.name)
+
+        self.assertFalse(cache.has_outputs(0, 0))
+        self.assertIsNone(cache.get_outputs(0, 0))
+
+        cache.set_outputs(0, 0, {'a': [1, 2]})
+        self.assertTrue(cache.has_outputs(0, 0))
+        self.assertFalse(cache.has_outputs(0, 1))
+        self.assertFalse(cache.has_outputs(1, 0))
+        self.assertEqual({'a': [1, 2]}, cache.get_outputs(0, 0))
+
+        cache.flush()
+        reopened = DiskCache(self.directory.name)
+        self.assertTrue(reopened.has_outputs(0, 0))
+        self.assertEqual({'a': [1, 2]}, reopened.get_outputs(0, 0))
+
+    def test_pickle(self):
+        cache = DiskCache(self.directory.name)
+        cache.set_outputs(2 ** 100, 1, 'value')
+
+        unpickled = pickle.loads(pickle.dumps(cache))
+        self.assertEqual('value', unpickled.get_outputs(2 ** 100, 1))
+
+    def test_batch(self):
+        cache = DiskCache(self.directory.name)
+        for i in range(100):
+            cache.set_outputs(0, i, i)
+        self.assertEqual(list(range(100)), [cache.get_outputs(0, i) for i in range(100)])
+        cache.flush()
+        reopened = DiskCache(self.directory.name)
+        self.assertEqual(list(range(100)), [reopened.get_outputs(0, i) for i in range(100)])
+
+    def test_cost(self):
+        cache = DiskCache(self.directory.name)
+        cache.set_outputs(0, 0, 'a', cost=2.5)
+        self.assertEqual(2.5, cache.get_cost(0, 0))
+        cache.flush()
+        reopened = DiskCache(self.directory.name)
+        self.assertEqual(2.5, reopened.get_cost(0, 0))
+        self.assertIsNone(reopened.get_cost(0, 1))
+
+    def test_nbytes(self):
+        cache = DiskCache(self.directory.name)
+        cache.set_outputs(0, 0, b'a' * 100)
+        nbytes = cache.get_nbytes()
+        self.assertGreater(nbytes, 100)
+        cache.flush()
+        self.assertEqual(nbytes, cache.get_nbytes())
+        cache.set_outputs(0, 1, b'a' * 100)
+        cache.flush()
+        self.assertEqual(2 * nbytes, cache.get_nbytes())
+        self.assertEqual(2 * nbytes, DiskCache(self.directory.name).get_nbytes())
+
+    def test_write_error(self):
+        cache = DiskCache(self.directory.name)
+        os.mkdir(os.path.join(self.directory.name, '0-0.pickle'))
+        cache.set_outputs(0, 0, 'a')
+        with self.assertRaises(OSError):
+            cache.flush()
+        self.assertFalse(cache.has_outputs(0, 0))
+        cache.set_outputs(0, 1, 'b')
+        cache.flush()
+        self.assertEqual('b', DiskCache(self.directory.name).get_outputs(0, 1))
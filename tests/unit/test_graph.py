@@ -0,0 +1,37 @@
+import ast
+
+from desync.graph import DataflowGraph
+from unittest import TestCase
+
+
+SOURCE = '''
+def workflow(samples):
+    trimmed = trim(samples)
+    aligned = [align(sample) for sample in trimmed]
+    counts = quantify(aligned)
+    report(check(samples))
+    return counts
+'''
+
+
+class TestDataflowGraph(TestCase):
+    def setUp(self):
+        self.tree = ast.parse(SOURCE)
+        self.graph = DataflowGraph(self.tree)
+        self.calls = {node.func.id: node for node in ast.walk(self.tree) if isinstance(node, ast.Call)}
+
+    def test_downstream(self):
+        self.assertSetEqual({self.calls['align']}, self.graph.get_downstream(self.calls['trim']))
+        self.assertSetEqual({self.calls['quantify']}, self.graph.get_downstream(self.calls['align']))
+        self.assertSetEqual({self.calls['report']}, self.graph.get_downstream(self.calls['check']))
+        self.assertSetEqual(set(), self.graph.get_downstream(self.calls['quantify']))
+
+    def test_prioritise(self):
+        self.graph.prioritise()
+        self.assertEqual(3, self.calls['trim'].priority)
+        self.assertEqual(2, self.calls['check'].priority)
+        self.assertEqual(1, self.calls['quantify'].priority)
+
+        self.graph.prioritise({'check': 10, 'report': 1, 'trim': 1, 'align': 1, 'quantify': 1})
+        self.assertEqual(3, self.calls['trim'].priority)
+        self.assertEqual(11, self.calls['check'].priority)
@@ -0,0 +1,220 @@
+import array
+import dataclasses
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+from desync import hashtools
+from desync.hashtools import FingerprintIndex, FingerprintRegistry, FunctionHashRegistry, InputHasher, hash_input, \
+    is_project_object, register_hasher
+from unittest import TestCase
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+
+class Opaque:
+    def __init__(self, key):
+        self.key = key
+
+
+@register_hasher(Opaque)
+def hash_opaque(value: Opaque, hasher: InputHasher):
+    hasher.hash(value.key)
+
+
+def step(value):
+    return value + 1
+
+
+def other_step(value):
+    return value + 2
+
+
+class TestFunctionHashRegistry(TestCase):
+    def test_get_hash(self):
+        registry = FunctionHashRegistry()
+
+        hash_ = registry.get_hash(step)
+        self.assertEqual((0, 1), (registry.hits, registry.misses))
+        self.assertEqual(hash_, registry.get_hash(step))
+        self.assertEqual((1, 1), (registry.hits, registry.misses))
+        self.assertNotEqual(hash_, registry.get_hash(other_step))
+        self.assertEqual((1, 2), (registry.hits, registry.misses))
+
+        registry.clear()
+        self.assertEqual(hash_, registry.get_hash(step))
+        self.assertEqual((0, 1), (registry.hits, registry.misses))
+
+
+class TestFingerprintRegistry(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        sys.path.insert(0, self.directory.name)
+        self.write('fingerprint_helpers', 'THRESHOLD = 1\n\ndef helper(value):\n    return value + 1\n')
+        self.steps = ('import fingerprint_helpers\nfrom fingerprint_helpers import THRESHOLD, helper\nSCALE = 2\n\n'
+                      'def direct(value):\n    return helper(value)\n\n'
+                      'def attribute(value):\n    return fingerprint_helpers.helper(value)\n\n'
+                      'def constant(value):\n    return value * SCALE\n\n'
+                      'WEIGHTS = {"a": [1, 2]}\nHANDLERS = {"a": object()}\n\n'
+                      'def container(value):\n    return value * WEIGHTS["a"][0]\n\n'
+                      'def opaque(value):\n    return HANDLERS["a"]\n\n'
+                      'def imported(value):\n    return value > THRESHOLD\n\n'
+                      'def imported_attribute(value):\n    return value > fingerprint_helpers.THRESHOLD\n')
+        self.write('fingerprint_steps', self.steps)
+
+    def tearDown(self):
+        sys.path.remove(self.directory.name)
+        for name in ('fingerprint_helpers', 'fingerprint_steps'):
+            sys.modules.pop(name, None)
+        self.directory.cleanup()
+
+    def write(self, name, source):
+        filename = os.path.join(self.directory.name, f'{name}.py')
+        with open(filename, 'w') as fileobj:
+            fileobj.write(source)
+        os.utime(filename, ns=(time.time_ns(), time.time_ns()))
+        importlib.invalidate_caches()
+        return importlib.reload(sys.modules[name]) if name in sys.modules else importlib.import_module(name)
+
+    def get_fingerprints(self):
+        registry = FingerprintRegistry()
+        steps = sys.modules['fingerprint_steps']
+        return {name: registry.get_fingerprint(getattr(steps, name)) for name in ('direct', 'attribute', 'constant', 'container', 'opaque')}
+
+    def test_helper_changed(self):
+        before = self.get_fingerprints()
+        self.write('fingerprint_helpers', 'THRESHOLD = 1\n\ndef helper(value):\n    return value + 2\n')
+        self.write('fingerprint_steps', self.steps)
+        after = self.get_fingerprints()
+        self.assertNotEqual(before['direct'], after['direct'])
+        self.assertNotEqual(before['attribute'], after['attribute'])
+        self.assertEqual(before['constant'], after['constant'])
+
+    def test_constant_changed(self):
+        before = self.get_fingerprints()
+        steps = sys.modules['fingerprint_steps']
+        steps.SCALE = 3
+        after = self.get_fingerprints()
+        self.assertEqual(before['direct'], after['direct'])
+        self.assertNotEqual(before['constant'], after['constant'])
+
+    def test_container_changed(self):
+        before = self.get_fingerprints()
+        steps = sys.modules['fingerprint_steps']
+        steps.WEIGHTS['a'][0] = 3
+        steps.HANDLERS['a'] = object()
+        after = self.get_fingerprints()
+        self.assertEqual(before['constant'], after['constant'])
+        self.assertNotEqual(before['container'], after['container'])
+        self.assertEqual(before['opaque'], after['opaque'])
+
+    def test_imported_constant(self):
+        steps = sys.modules['fingerprint_steps']
+        filenames = {steps.__file__, sys.modules['fingerprint_helpers'].__file__}
+        registry = FingerprintRegistry()
+        self.assertEqual(filenames, registry._get_fingerprint(steps.imported, frozenset())[1])
+        self.assertEqual(filenames, registry._get_fingerprint(steps.imported_attribute, frozenset())[1])
+        self.assertEqual({steps.__file__}, registry._get_fingerprint(steps.constant, frozenset())[1])
+
+    def test_index_constant_changed(self):
+        steps = sys.modules['fingerprint_steps']
+        hashtools.set_fingerprint_index(os.path.join(self.directory.name, 'fingerprints'))
+        try:
+            before = FingerprintRegistry().get_fingerprint(steps.constant)
+            hashtools.FINGERPRINT_INDEX.save()
+            steps.SCALE = 3
+            hashtools.set_fingerprint_index(os.path.join(self.directory.name, 'fingerprints'))
+            self.assertNotEqual(before, FingerprintRegistry().get_fingerprint(steps.constant))
+        finally:
+            hashtools.set_fingerprint_index(None)
+
+    def test_unknown_constant(self):
+        def closure(value):
+            return value * scale
+
+        scale = 2
+        self.assertIsNone(FingerprintRegistry()._get_fingerprint(closure, frozenset())[1])
+
+    def test_memoized(self):
+        registry = FingerprintRegistry()
+        self.assertEqual(registry.get_fingerprint(step), registry.get_fingerprint(step))
+        self.assertNotEqual(registry.get_fingerprint(step), registry.get_fingerprint(other_step))
+
+    def test_is_project_object(self):
+        self.assertTrue(is_project_object(step))
+        self.assertFalse(is_project_object(json.dumps))
+
+
+class TestFingerprintIndex(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'fingerprints')
+        self.source = os.path.join(self.directory.name, 'source.py')
+        with open(self.source, 'w') as fileobj:
+            fileobj.write('')
+
+    def tearDown(self):
+        hashtools.set_fingerprint_index(None)
+        self.directory.cleanup()
+
+    def test_index(self):
+        index = FingerprintIndex(self.filename)
+        self.assertIsNone(index.get('fingerprint', step))
+        index.set('fingerprint', step, 1, {step.__code__.co_filename, self.source})
+        index.save()
+
+        index = FingerprintIndex(self.filename)
+        self.assertEqual((1, {step.__code__.co_filename, self.source}, frozenset()), index.get('fingerprint', step))
+        self.assertIsNone(index.get('source', step))
+        self.assertIsNone(index.get('fingerprint', other_step))
+
+        os.utime(self.source, ns=(0, 0))
+        self.assertIsNone(index.get('fingerprint', step))
+
+    def test_registries(self):
+        hashtools.set_fingerprint_index(self.filename)
+        fingerprint = FingerprintRegistry().get_fingerprint(step)
+        hashtools.FINGERPRINT_INDEX.save()
+
+        hashtools.set_fingerprint_index(self.filename)
+        self.assertEqual(fingerprint, hashtools.FINGERPRINT_INDEX.get('fingerprint', step)[0])
+        self.assertEqual(fingerprint, FingerprintRegistry().get_fingerprint(step))
+
+
+class TestHashInput(TestCase):
+    def test_scalars(self):
+        self.assertEqual(hash_input([1, 'a'], {'b': 2.0}), hash_input((1, 'a'), {'b': 2.0}))
+        self.assertNotEqual(hash_input([1], {}), hash_input(['1'], {}))
+        self.assertNotEqual(hash_input([1], {}), hash_input([True], {}))
+        self.assertNotEqual(hash_input([1], {}), hash_input([], {'a': 1}))
+
+    def test_containers(self):
+        self.assertEqual(hash_input([{1: 2, 3: 4}], {}), hash_input([{3: 4, 1: 2}], {}))
+        self.assertEqual(hash_input([{1, 2, 3}], {}), hash_input([{3, 2, 1}], {}))
+        self.assertNotEqual(hash_input([[1, 2]], {}), hash_input([(1, 2)], {}))
+        self.assertNotEqual(hash_input([[[1], 2]], {}), hash_input([[1, [2]]], {}))
+
+        cycle = [1]
+        cycle.append(cycle)
+        self.assertEqual(hash_input([cycle], {}), hash_input([cycle], {}))
+
+    def test_buffers(self):
+        values = array.array('d', range(1000))
+        self.assertEqual(hash_input([values], {}), hash_input([array.array('d', range(1000))], {}))
+        self.assertNotEqual(hash_input([values], {}), hash_input([array.array('f', range(1000))], {}))
+        self.assertEqual(hash_input([memoryview(b'abc')], {}), hash_input([memoryview(b'xabc')[1:]], {}))
+
+    def test_dataclasses(self):
+        self.assertEqual(hash_input([Point(1, 2)], {}), hash_input([Point(1, 2)], {}))
+        self.assertNotEqual(hash_input([Point(1, 2)], {}), hash_input([Point(2, 1)], {}))
+
+    def test_register_hasher(self):
+        self.assertEqual(hash_input([Opaque(1)], {}), hash_input([Opaque(1)], {}))
+        self.assertNotEqual(hash_input([Opaque(1)], {}), hash_input([Opaque(2)], {}))
@@ -0,0 +1,45 @@
+import unittest
+
+from desync.metrics import Registry
+
+
+class TestRegistry(unittest.TestCase):
+    def test_counter(self):
+        registry = Registry()
+        counter = registry.counter('steps_total', 'Steps.')
+        counter.inc(step='a')
+        counter.inc(2, step='a')
+        counter.inc(step='b')
+        self.assertIs(counter, registry.counter('steps_total'))
+        self.assertEqual(3, registry.get_sample_value('steps_total', step='a'))
+        self.assertEqual(1, registry.get_sample_value('steps_total', step='b'))
+
+    def test_gauge_function(self):
+        registry = Registry()
+        registry.gauge('depth').set_function(lambda: 5)
+        self.assertEqual(5, registry.get_sample_value('depth'))
+
+    def test_histogram(self):
+        registry = Registry()
+        histogram = registry.histogram('latency', buckets=(1, 10))
+        for value in (0.5, 2, 20):
+            histogram.observe(value)
+        self.assertEqual(1, registry.get_sample_value('latency_bucket', le='1'))
+        self.assertEqual(2, registry.get_sample_value('latency_bucket', le='10'))
+        self.assertEqual(3, registry.get_sample_value('latency_bucket', le='+Inf'))
+        self.assertEqual(3, registry.get_sample_value('latency_count'))
+        self.assertEqual(22.5, registry.get_sample_value('latency_sum'))
+
+    def test_render(self):
+        registry = Registry()
+        registry.counter('steps_total', 'Steps.').inc(step='a "b"')
+        self.assertEqual(
+            '# HELP steps_total Steps.\n# TYPE steps_total counter\nsteps_total{step="a \\"b\\""} 1\n',
+            registry.render(),
+        )
+
+    def test_type_conflict(self):
+        registry = Registry()
+        registry.counter('steps')
+        with self.assertRaises(ValueError):
+            registry.gauge('steps')
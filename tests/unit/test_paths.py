@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+from desync import paths
+from desync.hashtools import hash_input
+from unittest import TestCase, mock
+
+
+class TestPaths(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'reads.fastq')
+        with open(self.filename, 'w') as fileobj:
+            fileobj.write('ACGT\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_hash_path(self):
+        path = paths.Path(self.filename)
+        hash_ = hash_input([path], {})
+        self.assertEqual(hash_, hash_input([path], {}))
+        self.assertNotEqual(hash_, hash_input([self.filename], {}))
+
+        with open(self.filename, 'w') as fileobj:
+            fileobj.write('TTTTTTTT\n')
+        self.assertNotEqual(hash_, hash_input([path], {}))
+
+    def test_stat_index(self):
+        index_filename = os.path.join(self.directory.name, 'index')
+        index = paths.StatIndex(index_filename)
+        digest = index.get_digest(self.filename)
+        self.assertFalse(os.path.exists(index_filename))
+        index.save()
+
+        with mock.patch('desync.paths.hash_file') as hash_file:
+            self.assertEqual(digest, paths.StatIndex(index_filename).get_digest(self.filename))
+            hash_file.assert_not_called()
@@ -0,0 +1,42 @@
+import asyncio
+
+from desync.futuretools import ensure_future
+from desync.resolver import has_futures, resolve
+from unittest import TestCase
+
+
+class TestResolve(TestCase):
+    def test_no_futures(self):
+        async def run():
+            value = [1, (2, 3), {'a': {4}}]
+            return value, await resolve(value)
+
+        value, resolved = asyncio.run(run())
+        self.assertIs(value, resolved)
+
+    def test_futures(self):
+        async def run():
+            value = [1, (ensure_future(2), 3), {'a': ensure_future({4})}, {ensure_future(5)}]
+            return await resolve(ensure_future(value))
+
+        self.assertEqual([1, (2, 3), {'a': {4}}, {5}], asyncio.run(run()))
+
+    def test_concurrent(self):
+        async def delay(value):
+            await asyncio.sleep(0.1)
+            return value
+
+        async def run():
+            start = asyncio.get_running_loop().time()
+            value = await resolve([asyncio.create_task(delay(i)) for i in range(10)])
+            return value, asyncio.get_running_loop().time() - start
+
+        value, duration = asyncio.run(run())
+        self.assertEqual(list(range(10)), value)
+        self.assertLess(duration, 0.5)
+
+    def test_has_futures(self):
+        async def run():
+            return has_futures([1, [2, ensure_future(3)]]), has_futures([1, [2, 3]])
+
+        self.assertEqual((True, False), asyncio.run(run()))
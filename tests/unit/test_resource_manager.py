@@ -1,3 +1,6 @@
+import asyncio
+import threading
+import time
 import unittest
 
 from desync.resource_manager import ResourceManager
@@ -15,6 +18,27 @@ class ResourceManagerTest(unittest.TestCase):
             with resource_manager.request(cpus=65):
                 pass
 
+    def test_request_underscore(self):
+        resource_manager = ResourceManager(cpus=64, mem_gb=256)
+        with resource_manager.request(cpus=4, mem_gb=8) as resources:
+            self.assertEqual({'cpus': 4, 'mem_gb': 8}, resources)
+        with resource_manager.request(max_mem_gb=512) as resources:
+            self.assertEqual({'mem_gb': 256}, resources)
+
+    def test_request_unknown(self):
+        resource_manager = ResourceManager(cpus=4)
+        for request in [{'mem_gb': 8}, {'gpus': 1}, {'max_gpus': 1}, {'min_mem_gb': 1}]:
+            with self.assertRaises(ValueError):
+                with resource_manager.request(**request):
+                    pass
+
+        async def run():
+            async with resource_manager.request(cpus=1, mem_gb=8):
+                pass
+
+        with self.assertRaises(ValueError):
+            asyncio.run(asyncio.wait_for(run(), 1))
+
     def test_request_min(self):
         resource_manager = ResourceManager(cpus=64)
         with resource_manager.request(min_cpus=32) as resources:
@@ -38,7 +62,85 @@ class ResourceManagerTest(unittest.TestCase):
             with resource_manager.request(min_cpus=65):
                 pass
 
+    def test_request_held(self):
+        resource_manager = ResourceManager(cpus=4)
+        acquired = threading.Event()
+
+        def hold():
+            with resource_manager.request(cpus=3):
+                acquired.set()
+                time.sleep(0.3)
+
+        thread = threading.Thread(target=hold)
+        with resource_manager.request(cpus=1):
+            thread.start()
+            acquired.wait()
+            with resource_manager.request(cpus=2) as resources:
+                self.assertEqual(2, resources['cpus'])
+            with self.assertRaises(ValueError):
+                with resource_manager.request(cpus=4):
+                    pass
+        thread.join()
+
     def test_request_max(self):
         resource_manager = ResourceManager(cpus=64)
         with resource_manager.request(max_cpus=128) as resources:
             self.assertEqual(64, resources['cpus'])
+
+    def test_acquire(self):
+        async def run():
+            resource_manager = ResourceManager(cpus=4)
+            order = []
+
+            async def step(name, cpus, priority=0):
+                async with resource_manager.request(priority, cpus=cpus) as resources:
+                    order.append(name)
+                    await asyncio.sleep(0.01)
+                    return resources['cpus']
+
+            first = asyncio.create_task(step('first', 4))
+            await asyncio.sleep(0)
+            tasks = [
+                asyncio.create_task(step('low', 1)),
+                asyncio.create_task(step('high', 4, priority=1)),
+                asyncio.create_task(step('last', 1)),
+            ]
+            results = await asyncio.gather(first, *tasks)
+            return results, order, resource_manager.available_resources
+
+        results, order, available = asyncio.run(run())
+        self.assertEqual([4, 1, 4, 1], results)
+        self.assertEqual(['first', 'high', 'low', 'last'], order)
+        self.assertEqual({'cpus': 4}, available)
+
+    def test_acquire_cancelled(self):
+        async def run():
+            resource_manager = ResourceManager(cpus=1)
+            granted = await resource_manager.acquire(cpus=1)
+            waiter = asyncio.create_task(resource_manager.acquire(cpus=1))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            resource_manager.release(granted)
+            await asyncio.sleep(0)
+            return resource_manager.available_resources
+
+        self.assertEqual({'cpus': 1}, asyncio.run(run()))
+
+    def test_backfill(self):
+        async def run(backfill):
+            resource_manager = ResourceManager(cpus=4)
+            resource_manager.backfill = backfill
+            granted = await resource_manager.acquire(cpus=3)
+            large = asyncio.create_task(resource_manager.acquire(cpus=4))
+            small = asyncio.create_task(resource_manager.acquire(cpus=1))
+            await asyncio.sleep(0.01)
+            small_done = small.done()
+            resource_manager.release(granted)
+            if small_done:
+                resource_manager.release(await small)
+            resource_manager.release(await large)
+            await small
+            return small_done
+
+        self.assertTrue(asyncio.run(run(True)))
+        self.assertFalse(asyncio.run(run(False)))
@@ -0,0 +1,31 @@
+import asyncio
+
+from desync.scheduler import Lane, Scheduler
+from unittest import TestCase
+
+
+class TestLane(TestCase):
+    def test_priority(self):
+        async def run():
+            lane = Lane(1)
+            order = []
+
+            async def step(name, priority):
+                await lane.acquire(priority)
+                order.append(name)
+                await asyncio.sleep(0)
+                lane.release()
+
+            await lane.acquire()
+            tasks = [asyncio.create_task(step(name, priority)) for name, priority in [('a', 1), ('b', 3), ('c', 2)]]
+            await asyncio.sleep(0)
+            lane.release()
+            await asyncio.gather(*tasks)
+            return order
+
+        self.assertEqual(['b', 'c', 'a'], asyncio.run(run()))
+
+
+class TestScheduler(TestCase):
+    def test_shared_executors(self):
+        self.assertIs(Scheduler().get_executor('io'), Scheduler().get_executor('io'))